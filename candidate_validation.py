@@ -0,0 +1,150 @@
+"""
+In-process validation of generated tests before they are appended.
+
+A generated test is only worth keeping if it passes on the original module
+and fails on the mutant it was written for. All candidates of a cycle are
+checked in one batch in this process: the original module and each distinct
+mutant are compiled once, and every candidate runs against both, with the
+module under test swapped in sys.modules so that both bare names and
+`from <module> import ...` inside a test resolve to the version under test.
+
+    validate_tests("calculator.py", source, [{"code": test_code, "mutated_source": mutant}])
+    -> [{"test": "test_add_mutation", "code": ..., "passes_original": True,
+         "kills_mutant": True, "error": None}]
+
+`error` says why a candidate was rejected.
+"""
+import ast
+import contextlib
+import signal
+import sys
+import threading
+import types
+
+import pytest
+
+from mutation_targets import module_name
+
+# Seconds one candidate may run against one module version
+DEFAULT_TIMEOUT = 5.0
+
+
+class Timeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+
+@contextlib.contextmanager
+def deadline(timeout):
+    """Raise Timeout in the block after `timeout` seconds, where signals allow it."""
+    # A mutant can loop forever; only the main thread can be interrupted
+    if not timeout or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def load_module(name, file, source, timeout=None):
+    """Compile and execute `source` as a fresh module named `name`."""
+    module = types.ModuleType(name)
+    module.__file__ = file
+    with deadline(timeout):
+        exec(compile(source, file, "exec", dont_inherit=True), module.__dict__)
+    return module
+
+
+def _test_name(code):
+    """Return the name of the first test function in `code`, or None."""
+    for node in ast.parse(code).body:
+        if isinstance(node, ast.FunctionDef) and node.name.startswith("test"):
+            return node.name
+    return None
+
+
+def _run_test(module, code, name, timeout):
+    """Run test `name` from `code` against `module`; None if it passed, else why it failed."""
+    namespace = {"pytest": pytest}
+    namespace.update({key: value for key, value in vars(module).items() if not key.startswith("_")})
+    saved = sys.modules.get(module.__name__)
+    sys.modules[module.__name__] = module
+    try:
+        with deadline(timeout):
+            exec(compile(code, f"<candidate {name}>", "exec", dont_inherit=True), namespace)
+            namespace[name]()
+        return None
+    except Timeout:
+        return f"timed out after {timeout}s"
+    except KeyboardInterrupt:
+        raise
+    except BaseException as e:
+        # pytest.fail() and friends raise BaseException subclasses
+        return f"{type(e).__name__}: {e}".rstrip(": ")
+    finally:
+        if saved is None:
+            sys.modules.pop(module.__name__, None)
+        else:
+            sys.modules[module.__name__] = saved
+
+
+def validate_tests(file, source, candidates, timeout=DEFAULT_TIMEOUT):
+    """Check each candidate {"code", "mutated_source"} against `source` and its mutant.
+
+    Returns one result per candidate, in order; a candidate is worth keeping
+    when both "passes_original" and "kills_mutant" are true.
+    """
+    name = module_name(file)
+    original = load_module(name, file, source)
+    mutants = {}
+    results = []
+    for candidate in candidates:
+        code = candidate["code"]
+        result = {"test": None, "code": code, "passes_original": False, "kills_mutant": False, "error": None}
+        results.append(result)
+        try:
+            result["test"] = _test_name(code)
+        except SyntaxError as e:
+            result["error"] = f"does not parse: {e}"
+            continue
+        if result["test"] is None:
+            result["error"] = "no test function"
+            continue
+
+        failure = _run_test(original, code, result["test"], timeout)
+        if failure:
+            result["error"] = f"fails on the original code: {failure}"
+            continue
+        result["passes_original"] = True
+
+        mutated_source = candidate["mutated_source"]
+        if mutated_source not in mutants:
+            try:
+                mutants[mutated_source] = load_module(name, file, mutated_source, timeout)
+            except Exception as e:
+                # A mutant that breaks or hangs at import is killed by any test that imports it
+                mutants[mutated_source] = e
+        mutant = mutants[mutated_source]
+        if isinstance(mutant, Exception):
+            result["kills_mutant"] = True
+        elif _run_test(mutant, code, result["test"], timeout):
+            result["kills_mutant"] = True
+        else:
+            result["error"] = "passes on the mutant"
+    return results
+
+
+def summarize(results):
+    """Return a one-line report of a validation batch."""
+    kept = sum(1 for result in results if result["kills_mutant"])
+    failing = sum(1 for result in results if result["error"] and not result["passes_original"])
+    weak = sum(1 for result in results if result["passes_original"] and not result["kills_mutant"])
+    return (f"Validated {len(results)} candidate tests: {kept} kill their mutant, "
+            f"{failing} rejected for failing on the original code, {weak} rejected for not killing their mutant")
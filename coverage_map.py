@@ -0,0 +1,129 @@
+"""
+Record which tests execute which lines of the modules under mutation.
+
+A small pytest plugin traces every test and notes the lines it runs in the
+target files, giving a line -> tests map from a single baseline run. Lines
+that execute while test modules are imported (module-level code) are
+credited to every test, since a mutant there affects the whole suite.
+
+Run as a script it performs the baseline run and writes the map as JSON:
+
+    python coverage_map.py <output.json> <target.py>... -- [pytest args...]
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+class LineRecorder:
+    """Pytest plugin that maps executed target lines to test node ids."""
+
+    def __init__(self, targets):
+        self.targets = {os.path.abspath(target): target for target in targets}
+        self.current = None
+        self.import_lines = {target: set() for target in targets}
+        self.test_lines = {}
+        self.test_ids = []
+
+    def _trace(self, frame, event, arg):
+        # Only frames from the target files get a local tracer
+        target = self.targets.get(frame.f_code.co_filename)
+        if target is None:
+            return None
+        lines = self.import_lines[target] if self.current is None else self.current.setdefault(target, set())
+
+        def trace_lines(frame, event, arg):
+            if event == "line":
+                lines.add(frame.f_lineno)
+            return trace_lines
+
+        return trace_lines
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection(self, session):
+        sys.settrace(self._trace)
+        try:
+            yield
+        finally:
+            sys.settrace(None)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.test_ids.append(item.nodeid)
+        self.current = self.test_lines.setdefault(item.nodeid, {})
+        sys.settrace(self._trace)
+        try:
+            yield
+        finally:
+            sys.settrace(None)
+            self.current = None
+
+    def line_map(self):
+        """Return {target: {line: [test ids]}} for everything recorded."""
+        # Dicts double as ordered sets, keeping tests in collection order
+        result = {target: {} for target in self.import_lines}
+        for target, lines in self.import_lines.items():
+            for line in lines:
+                result[target][line] = dict.fromkeys(self.test_ids)
+        for test_id in self.test_ids:
+            for target, lines in self.test_lines.get(test_id, {}).items():
+                for line in lines:
+                    result[target].setdefault(line, {})[test_id] = None
+        return {
+            target: {line: list(tests) for line, tests in lines.items()}
+            for target, lines in result.items()
+        }
+
+
+def build_line_map(targets, pytest_args=(), cwd=None):
+    """Run the suite once under tracing and return {target: {line: [test ids]}}.
+
+    Runs in a separate interpreter so the target modules are imported fresh.
+    """
+    output = os.path.join(cwd or ".", ".line_map.json")
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), output, *targets, "--", "-q", *pytest_args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=cwd
+    )
+    try:
+        with open(output, 'r') as f:
+            data = json.load(f)
+    finally:
+        if os.path.exists(output):
+            os.remove(output)
+    return {
+        target: {int(line): tests for line, tests in lines.items()}
+        for target, lines in data.items()
+    }
+
+
+def covering_tests(line_map, mutation):
+    """Return the ids of the tests that execute any line of `mutation`."""
+    lines = line_map.get(mutation["file"], {})
+    tests = {}
+    for line in range(mutation["line"], mutation["end_line"] + 1):
+        tests.update(dict.fromkeys(lines.get(line, [])))
+    return list(tests)
+
+
+def main(argv):
+    """Run pytest with a LineRecorder and dump its map to the output file."""
+    split = argv.index("--")
+    output, targets, pytest_args = argv[0], argv[1:split], argv[split + 1:]
+    sys.path.insert(0, os.getcwd())
+
+    recorder = LineRecorder(targets)
+    exit_code = pytest.main(pytest_args, plugins=[recorder])
+    with open(output, 'w') as f:
+        json.dump(recorder.line_map(), f)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,198 @@
+"""
+Differential search for inputs that tell a mutant from the original.
+
+Instead of guessing fixed inputs, the original and the mutated function are
+both called on a grid of candidate arguments, and the first inputs where
+their results or raised exceptions differ become the assertions of the
+generated test:
+
+    def test_add_mutant_7():
+        from calculator import add
+        assert add(0, 1) == 1
+        assert add(1, 1) == 2
+
+The grid is built from boundary values plus the numeric literals of the
+test file (and their neighbours), small integers first so the emitted
+assertions stay readable. The grid is generated lazily, shell by shell,
+so only the inputs actually screened are ever built. The functions
+themselves are plain Python and are called once per input.
+"""
+import ast
+import inspect
+import itertools
+import math
+import os
+
+from candidate_validation import Timeout, deadline, load_module
+from mutation_targets import module_name
+
+# Always tried, whatever the tests use
+BOUNDARY_VALUES = (0, 1, -1, 2, -2, 3, 10, -10, 100, 0.5, -0.5, 1.5)
+
+# Literals above this magnitude are left out, so that power() or factorial()
+# of a large literal cannot stall the search
+MAX_MAGNITUDE = 1000
+
+# Candidate inputs screened per mutant, and seconds allowed for them
+MAX_INPUTS = 5000
+DEFAULT_TIMEOUT = 2.0
+
+# Assertions emitted per generated test
+MAX_ASSERTIONS = 3
+
+
+def literal_values(test_files):
+    """Return the int and float literals (with their sign) used in `test_files`."""
+    literals = set()
+    for path in test_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            sign = 1
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+                sign, node = -1, node.operand
+            if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+                literals.add(sign * node.value)
+    return literals
+
+
+def seed_values(test_files=()):
+    """Return the values the grid is built from, small integers first."""
+    values = set(BOUNDARY_VALUES)
+    for literal in literal_values(test_files):
+        if isinstance(literal, float) and not math.isfinite(literal):
+            continue
+        values.add(literal)
+        # Off-by-one mutants show up next to the values the tests use
+        if isinstance(literal, int):
+            values.update((literal - 1, literal + 1))
+    values = {value for value in values if abs(value) <= MAX_MAGNITUDE}
+    # Ints before floats, so the first assertions found read like hand-written ones
+    return sorted(values, key=lambda value: (isinstance(value, float), abs(value), value < 0))
+
+
+def _shells(count, arity):
+    """Yield every index tuple over range(count), by increasing largest index."""
+    for k in range(count):
+        # Tuples whose first occurrence of the largest index k is at `position`
+        for position in range(arity):
+            yield from (
+                before + (k,) + after
+                for before in itertools.product(range(k), repeat=position)
+                for after in itertools.product(range(k + 1), repeat=arity - position - 1)
+            )
+
+
+def input_grid(values, arity, max_inputs=MAX_INPUTS):
+    """Return up to `max_inputs` argument tuples over `values`, smallest values first.
+
+    Only the returned tuples are built, whatever the size of the full grid.
+    """
+    if arity == 0:
+        return [()]
+    # Map back to the Python values, so ints stay ints
+    return [tuple(values[index] for index in row)
+            for row in itertools.islice(_shells(len(values), arity), max_inputs)]
+
+
+def _outcome(func, args):
+    try:
+        return ("value", func(*args))
+    except Timeout:
+        raise
+    except Exception as e:
+        return ("raises", type(e))
+
+
+def _same(first, second):
+    if first[0] != second[0]:
+        return False
+    if first[0] == "raises":
+        return first[1] is second[1]
+    a, b = first[1], second[1]
+    if type(a) in (int, float) and type(b) in (int, float):
+        if isinstance(a, float) or isinstance(b, float):
+            # pytest.approx could not tell closer values apart anyway
+            return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-12)
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def _literal(value):
+    """Whether `value` can be written into a test and read back equal."""
+    try:
+        return ast.literal_eval(repr(value)) == value
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return False
+
+
+def find_killing_inputs(original, mutant, values, limit=MAX_ASSERTIONS, timeout=DEFAULT_TIMEOUT):
+    """Return up to `limit` (args, original outcome) pairs where `mutant` behaves differently.
+
+    An outcome is ("value", result) or ("raises", exception type). Only
+    inputs whose original outcome can be written as a literal are returned.
+    """
+    parameters = inspect.signature(original).parameters.values()
+    arity = sum(1 for parameter in parameters
+                if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+                and parameter.default is parameter.empty)
+    found = []
+    try:
+        with deadline(timeout):
+            for args in input_grid(values, arity):
+                expected = _outcome(original, args)
+                if expected[0] == "value" and not _literal(expected[1]):
+                    continue
+                if not _same(expected, _outcome(mutant, args)):
+                    found.append((args, expected))
+                    if len(found) >= limit:
+                        break
+    except Timeout:
+        # Keep whatever was found; a mutant that hangs is left to the test runner
+        pass
+    return found
+
+
+def _assertion(func_name, args, expected):
+    call = f"{func_name}({', '.join(map(repr, args))})"
+    if expected[0] == "raises":
+        return f"    with pytest.raises({expected[1].__name__}):\n        {call}"
+    if isinstance(expected[1], float):
+        return f"    assert {call} == pytest.approx({expected[1]!r})"
+    return f"    assert {call} == {expected[1]!r}"
+
+
+def differential_test(file, source, mutated_source, func_name, test_name, test_files=()):
+    """Return a test that kills the mutant of `func_name`, or None if no input tells them apart.
+
+    `test_files` supply the literals the input grid is seeded with.
+    """
+    name = module_name(file)
+    try:
+        original = getattr(load_module(name, file, source), func_name)
+        mutant = getattr(load_module(name, file, mutated_source, DEFAULT_TIMEOUT), func_name)
+    except Exception:
+        return None
+    if not callable(original) or not callable(mutant):
+        return None
+
+    found = find_killing_inputs(original, mutant, seed_values(test_files))
+    if not found:
+        return None
+    # Exception types outside builtins would need an import of their own
+    assertions = [_assertion(func_name, args, expected) for args, expected in found
+                  if expected[0] == "value" or expected[1].__module__ == "builtins"]
+    if not assertions:
+        return None
+    body = "\n".join(assertions)
+    return f"""
+def {test_name}():
+    \"\"\"Inputs on which the mutant of {func_name} differs from the original.\"\"\"
+    import pytest
+    from {name} import {func_name}
+{body}
+"""
@@ -1,49 +1,60 @@
 import os
 import sys
+import atexit
 import re
 import tempfile
 import subprocess
 import shutil
-from pathlib import Path
-
-# Mutation types to apply
-MUTATIONS = {
-    # Arithmetic mutations
-    r'\+': '-',             # + to -
-    r'-(?![>])': '+',       # - to + (avoid matching ->)
-    r'\*\*': '*',           # ** to *
-    r'\*(?!\*)': '/',       # * to / (avoid matching **)
-    r'/': '*',              # / to *
-    r'%': '/',              # % to /
-    
-    # Comparison mutations
-    r'==': '!=',            # == to !=
-    r'!=': '==',            # != to ==
-    r'>': '<=',             # > to <=
-    r'<': '>=',             # < to >=
-    r'>=': '<',             # >= to <
-    r'<=': '>',             # <= to >
-    
-    # Boolean mutations
-    r' and ': ' or ',       # and to or
-    r' or ': ' and ',       # or to and
-    r'not ': '',            # not to nothing
-    
-    # Return value mutations
-    r'return (.+)': r'return True',   # return x to return True
-    r'return True': 'return False',   # return True to return False
-    r'return False': 'return True',   # return False to return True
-    
-    # Exception mutations
-    r'raise (.+)': r'pass',  # raise to pass
-    
-    # Value mutations
-    r'\b0\b': '1',          # 0 to 1
-    r'\b1\b': '0',          # 1 to 0
-    r'\bTrue\b': 'False',   # True to False
-    r'\bFalse\b': 'True',   # False to True
-    r'\bNone\b': 'True',    # None to True
-}
+import argparse
+import functools
+import itertools
+import time
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+
+import mutation_profile
+from candidate_validation import summarize, validate_tests
+from differential_search import differential_test
+from mutation_operators import filter_equivalent, find_mutations, mutate_source, source_lines
+from mutation_profile import span
+from mutation_results import DEFAULT_RESULTS_FILE, ResultsLog
+from mutation_sampling import DEFAULT_SEED, estimate_score, sample_size, stratified_sample
+from mutation_schemata import MUTANT_ID_VARIABLE, build_schema
+from mutation_targets import expand_targets, module_name, package_name, paths_to_mutate
+from coverage_map import build_line_map, covering_tests
+from pytest_worker import PytestWorker, set_resource_limits
+from results_store import DEFAULT_STORE_FILE, ResultsStore, StoreCache, StoreHistory, function_names
+from suite_index import SuiteIndex
+from mutation_cache import (DEFAULT_CACHE_FILE, DEFAULT_HISTORY_FILE, KillHistory, MutationCache,
+                            mutation_keys, mutation_location, order_tests)
+
+# Script that runs pytest with a mutant served from memory
+MUTANT_LOADER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mutant_loader.py")
+
+# Possible outcomes of testing a single mutant
+KILLED = "killed"
+SURVIVED = "survived"
+NO_COVERAGE = "no coverage"
+TIMEOUT = "timeout"
+RESOURCE = "resource"
+
+# Status of a single test run, and the mutant outcome it stands for
+PASSED = "passed"
+FAILED = "failed"
+STATUS_OUTCOMES = {PASSED: SURVIVED, FAILED: KILLED, TIMEOUT: TIMEOUT, RESOURCE: RESOURCE}
+
+# Per-mutant deadlines never drop below this many seconds
+MIN_TIMEOUT = 1.0
+
+# Package runs hand mutants to workers in chunks of at most this many
+PACKAGE_CHUNK = 20
+
+# Warm servers a package worker keeps alive, one per module; the least
+# recently used is closed when another module needs one
+MAX_WARM_MODULES = 4
+
+# Node id of a failing test in pytest's short test summary
+FAILED_TEST = re.compile(r'^(?:FAILED|ERROR) (\S+)', re.MULTILINE)
 
 def backup_file(filepath):
     """Create a backup of the file."""
@@ -56,105 +67,702 @@ def restore_file(backup_path, filepath):
     shutil.copy(backup_path, filepath)
     os.remove(backup_path)
 
-def apply_mutation(filepath, pattern, replacement, line_index):
-    """Apply a mutation to a file at a specific line."""
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    
-    original_line = lines[line_index]
-    
-    # Apply the mutation
-    if re.search(pattern, original_line):
-        lines[line_index] = re.sub(pattern, replacement, original_line, count=1)
-        with open(filepath, 'w') as f:
-            f.writelines(lines)
-        return True, original_line, lines[line_index]
-    return False, original_line, original_line
-
-def run_tests():
-    """Run pytest and return True if all tests pass."""
-    result = subprocess.run(
-        [sys.executable, "-m", "pytest", "-q"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+def _pytest_args(tests, fail_fast):
+    """Common pytest arguments: quiet, failures listed, optional -x and test ids."""
+    return ["-q", "-rfE", *(["-x"] if fail_fast else []), *(tests or [])]
+
+def _run_pytest(command, cwd=None, source=None, timeout=None, limits=None, env=None):
+    """Run a pytest command line and return (status, first failing test id or None)."""
+    preexec_fn = None
+    if limits and os.name == "posix":
+        preexec_fn = functools.partial(set_resource_limits, **limits)
+    try:
+        result = subprocess.run(
+            command,
+            input=source,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=cwd,
+            timeout=timeout,
+            preexec_fn=preexec_fn,
+            env={**os.environ, **env} if env else None
+        )
+    except subprocess.TimeoutExpired:
+        return TIMEOUT, None
+    
+    if result.returncode == 0:
+        return PASSED, None
+    failed = FAILED_TEST.search(result.stdout)
+    failed = failed.group(1) if failed else None
+    # Killed by a signal (SIGXCPU, SIGKILL) or out of address space
+    if result.returncode < 0 or "MemoryError" in result.stdout + result.stderr:
+        return RESOURCE, failed
+    return FAILED, failed
+
+def run_tests(cwd=None, tests=None, fail_fast=False, timeout=None, limits=None):
+    """Run pytest and return (status, first failing test).
+
+    The status is PASSED when all tests pass, FAILED when one fails, or
+    TIMEOUT / RESOURCE when the run hit `timeout` seconds or one of the
+    `limits` (keyword arguments of set_resource_limits). `tests` optionally
+    restricts the run to the given test node ids, which pytest runs in the
+    given order; `fail_fast` stops at the first failure.
+    """
+    command = [sys.executable, "-m", "pytest", *_pytest_args(tests, fail_fast)]
+    return _run_pytest(command, cwd=cwd, timeout=timeout, limits=limits)
+
+def run_tests_in_memory(file_to_mutate, source, cwd=None, tests=None, fail_fast=False, timeout=None, limits=None,
+                        env=None):
+    """Run pytest with `source` served in place of `file_to_mutate` via an import hook.
+
+    `env` adds environment variables for the test process.
+    """
+    # The cache provider is disabled so concurrent runs never race on .pytest_cache
+    command = [sys.executable, MUTANT_LOADER, module_name(file_to_mutate), file_to_mutate, "-p", "no:cacheprovider",
+               *_pytest_args(tests, fail_fast)]
+    return _run_pytest(command, cwd=cwd, source=source, timeout=timeout, limits=limits, env=env)
+
+def create_sandbox(project_dir):
+    """Copy the project into a fresh temporary directory and return its path."""
+    sandbox = tempfile.mkdtemp(prefix="mutation-sandbox-")
+    shutil.copytree(
+        project_dir, sandbox, dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(".git", "__pycache__", ".pytest_cache", "*.bak")
     )
-    return result.returncode == 0
+    return sandbox
+
+# Per-process state for check_mutation, set up by init_worker
+_worker = {}
+
+def init_worker(file_to_mutate, source, in_memory, sandboxed, line_map=None, warm=False,
+                fail_fast=False, rankings=None, schema=None):
+    """Prepare this process to test mutants of `file_to_mutate`.
+
+    Sandboxed workers get a private copy of the project so that on-disk
+    mutants of concurrent workers never see each other. With a `line_map`
+    only the tests covering a mutant are run against it. Warm workers keep
+    one collected pytest session alive and fork it for every mutant.
+    `rankings` maps mutant locations to the tests that killed there most
+    often; with `fail_fast` those run first and the run stops at a failure.
+    `schema` is a (schema_source, schema_ids) pair from build_schema: the
+    schema module is loaded instead of the file and mutants listed in
+    `schema_ids` are selected by number rather than by swapping code.
+    """
+    mutation_profile.start_worker()
+    _worker.clear()
+    _worker.update(in_memory=in_memory, cwd=None, line_map=line_map, fail_fast=fail_fast, rankings=rankings or {})
+    _worker.update(_module_state(file_to_mutate, source, warm, schema))
+    if sandboxed and not in_memory and not warm:
+        _worker["cwd"] = _sandbox_worker()
+
+def _module_state(file_to_mutate, source, warm=False, schema=None):
+    """Return the part of the worker state that belongs to one module."""
+    schema_source, schema_ids = schema or (None, {})
+    state = {"file": file_to_mutate, "source": source, "warm": None,
+             "schema_source": schema_source, "schema_ids": schema_ids}
+    if warm:
+        state["warm"] = PytestWorker(module_name(file_to_mutate), module_source=schema_source,
+                                      module_file=file_to_mutate)
+        multiprocessing.util.Finalize(None, state["warm"].close, exitpriority=10)
+    return state
+
+def _sandbox_worker():
+    """Give this worker a private copy of the project and return its path."""
+    sandbox = create_sandbox(os.getcwd())
+    # Runs when the pool shuts the worker down (atexit is skipped there)
+    multiprocessing.util.Finalize(
+        None, shutil.rmtree, args=(sandbox,), kwargs={"ignore_errors": True}, exitpriority=10
+    )
+    return sandbox
+
+def init_package_worker(modules, in_memory, sandboxed, line_map=None, warm=False, fail_fast=False, rankings=None):
+    """Prepare this process to test mutants of any of `modules`.
 
-def analyze_mutations(file_to_mutate="calculator.py", test_file="test_calculator.py"):
-    """Test each possible mutation in the code."""
-    total_mutations = 0
+    `modules` maps each file to its (source, schema) pair; schema is None
+    unless schemata are used. A module's state is built when its first
+    mutant arrives. Other arguments are as for init_worker.
+    """
+    init_worker(None, None, in_memory, sandboxed and not warm, line_map, False, fail_fast, rankings)
+    _worker.update(modules=modules, warm_modules=warm, loaded={})
+
+def _use_module(file_to_mutate):
+    """Switch a package worker over to the mutants of `file_to_mutate`."""
+    loaded = _worker["loaded"]
+    # Re-inserting keeps `loaded` ordered from least to most recently used
+    state = loaded.pop(file_to_mutate, None)
+    if state is None:
+        source, schema = _worker["modules"][file_to_mutate]
+        state = _module_state(file_to_mutate, source, _worker["warm_modules"], schema)
+    loaded[file_to_mutate] = state
+    warm = [file for file, other in loaded.items() if other["warm"]]
+    for file in warm[:-MAX_WARM_MODULES]:
+        loaded.pop(file)["warm"].close()
+    _worker.update(state)
+
+def _close_warm_servers():
+    """Stop every warm server this process started."""
+    states = list(_worker.get("loaded", {}).values()) or [_worker]
+    for state in states:
+        if state.get("warm"):
+            state["warm"].close()
+
+def _execute(source, tests=None, fail_fast=False, first=None, timeout=None, limits=None, mutant_id=None):
+    """Run the tests against `source`, or schema mutant `mutant_id`, the way this worker was set up to."""
+    cwd = _worker["cwd"]
+    if _worker["warm"]:
+        with span("mutant.run"):
+            result = _worker["warm"].run(source, tests, fail_fast=fail_fast, first=first, timeout=timeout,
+                                         limits=limits, mutant_id=mutant_id)
+        return result.get("status", PASSED if result["survived"] else FAILED), (result["failed"] or [None])[0]
+    if mutant_id is not None:
+        with span("mutant.run"):
+            return run_tests_in_memory(_worker["file"], _worker["schema_source"], cwd=cwd, tests=tests,
+                                       fail_fast=fail_fast, timeout=timeout, limits=limits,
+                                       env={MUTANT_ID_VARIABLE: str(mutant_id)})
+    if _worker["in_memory"]:
+        with span("mutant.run"):
+            return run_tests_in_memory(_worker["file"], source, cwd=cwd, tests=tests, fail_fast=fail_fast,
+                                       timeout=timeout, limits=limits)
+    
+    path = os.path.join(cwd, _worker["file"]) if cwd else _worker["file"]
+    with span("mutant.apply"):
+        # The file's own bytes are put back, so its line endings survive the run
+        with open(path, 'rb') as f:
+            original = f.read()
+        with open(path, 'w') as f:
+            f.write(source)
+    try:
+        with span("mutant.run"):
+            return run_tests(cwd=cwd, tests=tests, fail_fast=fail_fast, timeout=timeout, limits=limits)
+    finally:
+        with span("mutant.restore"):
+            with open(path, 'wb') as f:
+                f.write(original)
+
+def run_baseline():
+    """Run the whole suite against the unmutated source; return (status, seconds)."""
+    start = time.perf_counter()
+    if _worker["schema_source"] is not None:
+        status, _ = _execute(None, mutant_id=0)
+    else:
+        status, _ = _execute(_worker["source"])
+    return status, time.perf_counter() - start
+
+def check_mutation(mutation, timeout=None, limits=None):
+    """Run the tests against one mutant and return (outcome, killing test, seconds)."""
+    with span("mutant", id=mutation["id"]) as current:
+        outcome, killer, seconds = _check_mutation(mutation, timeout, limits)
+        current.set(outcome=outcome)
+    return outcome, killer, seconds
+
+def _check_mutation(mutation, timeout=None, limits=None):
+    """Body of check_mutation, run inside its span."""
+    start = time.perf_counter()
+    tests = None
+    if _worker["line_map"] is not None:
+        tests = covering_tests(_worker["line_map"], mutation)
+        # No test executes the mutated code, so nothing can kill it
+        if not tests:
+            return NO_COVERAGE, None, time.perf_counter() - start
+    
+    fail_fast = _worker["fail_fast"]
+    ranking = _worker["rankings"].get(mutation_location(mutation), []) if fail_fast else []
+    if tests is not None and ranking:
+        tests = order_tests(tests, ranking)
+    
+    mutant_id = _worker["schema_ids"].get(mutation["id"])
+    with span("mutant.mutate"):
+        source = mutate_source(_worker["source"], mutation) if mutant_id is None else None
+    status, killer = _execute(source, tests, fail_fast, ranking, timeout, limits, mutant_id)
+    return STATUS_OUTCOMES[status], killer, time.perf_counter() - start
+
+def check_mutations(file_to_mutate, mutations, timeout=None, limits=None):
+    """Run check_mutation for a chunk of mutants of one module in a package worker."""
+    with span("worker.use_module", file=file_to_mutate):
+        _use_module(file_to_mutate)
+    return [check_mutation(mutation, timeout, limits) for mutation in mutations]
+
+def analyze_mutations(file_to_mutate="calculator.py", test_file="test_calculator.py", in_memory=False, jobs=1,
+                      coverage=False, warm=False, cache_file=None, fail_fast=False, history_file=None,
+                      timeout_factor=None, memory_limit=None, cpu_limit=None, deduplicate=True, schemata=False,
+                      sample=None, seed=DEFAULT_SEED, results_file=None, resume=False, store_file=None):
+    """Test each possible mutation in the code.
+
+    With `in_memory=True` mutants are never written to disk: each mutated
+    source is handed to the test run through an import hook instead.
+    With `jobs > 1` mutants are spread over a process pool; results are
+    reported in the same order as a sequential run.
+    With `coverage=True` one traced baseline run maps lines to tests, and
+    each mutant only runs the tests that cover it.
+    With `warm=True` a long-lived pytest worker collects the suite once and
+    forks per mutant; like in-memory mode it never touches the file.
+    With a `cache_file` outcomes are remembered per mutant, keyed by the
+    enclosing function's source and the tests covering it, and mutants
+    whose inputs did not change are not run again.
+    With `fail_fast=True` each mutant stops at its first failing test. A
+    `history_file` counts which tests killed mutants at each line; when the
+    tests to run are known (coverage or warm mode) the most frequent killers
+    at a mutant's line run first.
+    With a `timeout_factor` the unmutated suite is timed once and each
+    mutant gets that many times as long (at least MIN_TIMEOUT seconds);
+    `memory_limit` (MiB) and `cpu_limit` (seconds) cap every test run.
+    Mutants stopped by either are killed, but reported as "timeout" or
+    "resource" so hangs and blow-ups stand out.
+    With `deduplicate=True` mutants that compile to the same bytecode as the
+    original (equivalent) or as another mutant (duplicate) are dropped
+    before execution and reported separately; they do not count towards
+    the score.
+    With `schemata=True` all mutants are compiled into one schema module
+    (see mutation_schemata) that each worker imports once; a mutant is then
+    selected by number. Like in-memory mode it never touches the file. It
+    only pays off with `warm=True`: otherwise every mutant's test run
+    compiles the whole schema module again.
+    `sample` ("10%" or a count) tests only a random sample of the mutants,
+    stratified by operator and function and drawn with `seed`, and reports
+    the estimated score of all of them with a 95% confidence interval.
+    With a `results_file` one JSON record per mutant is appended as soon as
+    it finishes (see mutation_results); `resume=True` keeps the records
+    already there and skips those mutants.
+    With a `store_file` the run and every mutant's outcome are also kept in
+    a SQLite results store (see results_store), which then replaces the
+    cache and history files as the source of cached outcomes and killers.
+    """
     surviving_mutations = []
+    uncovered = timeouts = resource_kills = 0
+    
+    # Read and parse the file once; every mutant is derived from this source
+    with open(file_to_mutate, 'r') as f:
+        source = f.read()
+    
+    with span("analyze.enumerate"):
+        mutations = find_mutations(file_to_mutate, source)
+    equivalent, duplicates = [], []
+    if deduplicate:
+        with span("analyze.dedupe"):
+            mutations, equivalent, duplicates = filter_equivalent(source, mutations, file_to_mutate)
+    strata = None
+    if sample and mutations:
+        population = len(mutations)
+        mutations, strata = stratified_sample(source, mutations, sample_size(sample, population), seed)
+        print(f"Sampled {len(mutations)} of {population} mutant(s) from {len(strata)} strata (seed {seed})")
+    # Schema mutants are never written to disk
+    in_memory = in_memory or schemata
+    mode = " (warm worker)" if warm else " (in memory)" if in_memory else ""
+    mode += ", schemata" if schemata else ""
+    print(f"Analyzing mutations in {file_to_mutate}{mode} with {jobs} job(s)...")
+    
+    schema = None
+    if schemata:
+        with span("analyze.schema"):
+            schema_source, schema_ids, unsupported = build_schema(source, mutations)
+        schema = (schema_source, schema_ids)
+        print(f"Compiled {len(schema_ids)} mutant(s) into one schema module; "
+              f"{len(unsupported)} outside function bodies are tested individually")
+    if equivalent or duplicates:
+        print(f"Dropped {len(equivalent)} equivalent and {len(duplicates)} duplicate mutant(s) (identical bytecode)")
+    
+    line_map = None
+    if coverage:
+        with span("analyze.coverage_map"):
+            line_map = build_line_map([file_to_mutate])
+        print(f"Recorded test coverage for {len(line_map.get(file_to_mutate, {}))} lines")
+    
+    store = run_id = None
+    if store_file:
+        store = ResultsStore(store_file)
+        run_id = store.start_run([file_to_mutate], {"jobs": jobs, "in_memory": in_memory, "warm": warm,
+                                                 "coverage": coverage, "schemata": schemata, "sample": sample})
+        functions = function_names(source, mutations)
+    
+    cache = keys = None
+    pending = mutations
+    if cache_file:
+        cache = StoreCache(store) if store else MutationCache(cache_file)
+        with span("analyze.cache_keys"):
+            keys = mutation_keys(source, mutations, line_map)
+        pending = [m for m, key in zip(mutations, keys) if cache.get(key) is None]
+        print(f"Reusing {len(mutations) - len(pending)} cached outcome(s), testing {len(pending)} mutant(s)")
+    
+    results = None
+    resumed = {}
+    if results_file:
+        results = ResultsLog(results_file, {file_to_mutate: source}, resume=resume)
+        resumed = {m["id"]: results.completed[m["id"]] for m in mutations if m["id"] in results.completed}
+        pending = [m for m in pending if m["id"] not in resumed]
+        if resume:
+            print(f"Resuming: {len(resumed)} mutant(s) already recorded in {results_file}")
+    
+    history = None
+    if history_file:
+        history = StoreHistory(store) if store else KillHistory(history_file)
+    rankings = {}
+    if history and fail_fast:
+        for mutation in pending:
+            location = mutation_location(mutation)
+            rankings[location] = history.ranking(location)
     
     # Create a backup of the original file
-    backup_path = backup_file(file_to_mutate)
+    backup_path = None if in_memory or warm or jobs > 1 else backup_file(file_to_mutate)
     
+    executor = None
     try:
-        # Get the lines from the file
-        with open(file_to_mutate, 'r') as f:
-            lines = f.readlines()
+        if not pending:
+            outcomes = iter(())
+        elif jobs > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=init_worker,
+                initargs=(file_to_mutate, source, in_memory, True, line_map, warm, fail_fast, rankings, schema)
+            )
+        else:
+            init_worker(file_to_mutate, source, in_memory, False, line_map, warm, fail_fast, rankings, schema)
         
-        # Try each mutation pattern on each line
-        print(f"Analyzing mutations in {file_to_mutate}...")
+        timeout = None
+        if pending and timeout_factor:
+            # Calibrate on the unmutated code, through the same runner the mutants use
+            with span("analyze.baseline"):
+                status, seconds = executor.submit(run_baseline).result() if executor else run_baseline()
+            if status != PASSED:
+                print(f"Warning: the tests do not pass on the unmutated code ({status}); results are unreliable")
+            timeout = max(seconds * timeout_factor, MIN_TIMEOUT)
+            print(f"Baseline test run took {seconds:.2f}s; per-mutant timeout is {timeout:.2f}s")
+        
+        limits = {"memory_mb": memory_limit, "cpu_seconds": cpu_limit} if memory_limit or cpu_limit else None
+        if executor:
+            outcomes = executor.map(check_mutation, pending, itertools.repeat(timeout), itertools.repeat(limits))
+        elif pending:
+            outcomes = map(check_mutation, pending, itertools.repeat(timeout), itertools.repeat(limits))
+        
+        for number, mutation in enumerate(mutations, 1):
+            mutation_desc = f"Line {mutation['line']}: {mutation['original']} -> {mutation['mutated']}"
+            print(f"Testing mutation {number}: {mutation_desc}", end=" ... ")
+            
+            key = keys[number - 1] if keys else None
+            cached = cache.get(key) if cache else None
+            if mutation["id"] in resumed:
+                outcome = resumed[mutation["id"]]["outcome"]
+                print("(resumed)", end=" ")
+            elif cached:
+                outcome = cached
+                print("(cached)", end=" ")
+                if results:
+                    results.write(mutation, outcome, cached=True)
+                if store:
+                    store.record(run_id, mutation, outcome, cached=True, key=key, function=functions[mutation["id"]])
+            else:
+                outcome, killer, seconds = next(outcomes)
+                if cache:
+                    cache.put(key, outcome)
+                if history and killer:
+                    history.record(mutation_location(mutation), killer)
+                if results:
+                    results.write(mutation, outcome, seconds, killer)
+                if store:
+                    store.record(run_id, mutation, outcome, seconds, killer, key=key, function=functions[mutation["id"]])
+            
+            # Tests pass despite the mutation - this is a surviving mutation
+            if outcome == SURVIVED:
+                surviving_mutations.append(mutation)
+                print("SURVIVED (not caught by tests)")
+            elif outcome == NO_COVERAGE:
+                # Never executed by any test, so it needs a test just as much
+                surviving_mutations.append(mutation)
+                uncovered += 1
+                print("NO COVERAGE (no test executes this line)")
+            elif outcome == TIMEOUT:
+                timeouts += 1
+                print("killed (timeout)")
+            elif outcome == RESOURCE:
+                resource_kills += 1
+                print("killed (resource limit)")
+            else:
+                print("killed (caught by tests)")
         
-        for line_index, line in enumerate(lines):
-            for pattern, replacement in MUTATIONS.items():
-                # Skip comments and docstrings
-                if line.strip().startswith("#") or line.strip().startswith('"""'):
-                    continue
-                
-                # Apply the mutation
-                applied, original, mutated = apply_mutation(
-                    file_to_mutate, pattern, replacement, line_index
-                )
-                
-                if applied:
-                    total_mutations += 1
-                    mutation_desc = f"Line {line_index+1}: {original.strip()} -> {mutated.strip()}"
-                    print(f"Testing mutation {total_mutations}: {mutation_desc}", end=" ... ")
-                    
-                    # Check if the tests catch this mutation
-                    if run_tests():
-                        # Tests pass despite the mutation - this is a surviving mutation
-                        surviving_mutations.append({
-                            "line": line_index + 1,
-                            "original": original.strip(),
-                            "mutated": mutated.strip(),
-                            "file": file_to_mutate,
-                            "pattern": pattern,
-                            "replacement": replacement
-                        })
-                        print("SURVIVED (not caught by tests)")
-                    else:
-                        print("killed (caught by tests)")
-                    
-                    # Restore the file after each mutation test
-                    restore_file(backup_path, file_to_mutate)
-                    backup_path = backup_file(file_to_mutate)
-    
     finally:
+        if results:
+            results.close()
+        if cache:
+            cache.save()
+        if history:
+            history.save()
+        if store:
+            store.finish_run(run_id)
+            store.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        else:
+            _close_warm_servers()
+        
         # Ensure we restore the original file
-        try:
-            restore_file(backup_path, file_to_mutate)
-        except:
-            pass
+        if backup_path:
+            try:
+                restore_file(backup_path, file_to_mutate)
+            except:
+                pass
+    
+    print_summary(file_to_mutate, len(mutations), surviving_mutations, uncovered, timeouts, resource_kills,
+                  len(equivalent), len(duplicates))
+    if strata:
+        score, low, high = estimate_score(strata, mutations, surviving_mutations)
+        print(f"Estimated mutation score: {score * 100:.2f}% (95% CI {low * 100:.2f}%-{high * 100:.2f}%)")
+    return surviving_mutations
+
+def _mutant_cost(mutation, line_map):
+    """Estimate the cost of testing a mutant: the tests that run against it."""
+    return len(covering_tests(line_map, mutation)) if line_map is not None else 1
+
+def schedule_mutants(pending, line_map, chunk_size):
+    """Split `pending` into per-module chunks, most expensive chunk first."""
+    by_file = {}
+    for mutation in pending:
+        by_file.setdefault(mutation["file"], []).append(mutation)
+    chunks = []
+    for file, mutations in by_file.items():
+        mutations.sort(key=lambda mutation: -_mutant_cost(mutation, line_map))
+        for start in range(0, len(mutations), chunk_size):
+            chunk = mutations[start:start + chunk_size]
+            chunks.append((sum(_mutant_cost(mutation, line_map) for mutation in chunk), file, chunk))
+    chunks.sort(key=lambda chunk: -chunk[0])
+    return [(file, chunk) for _, file, chunk in chunks]
+
+def calibrate_package_timeout(timeout_factor):
+    """Time one unmutated run of the suite and return the per-mutant timeout."""
+    # Every module shares the suite, so one unmutated run calibrates them all
+    start = time.perf_counter()
+    with span("analyze.baseline"):
+        status, _ = run_tests()
+    seconds = time.perf_counter() - start
+    if status != PASSED:
+        print(f"Warning: the tests do not pass on the unmutated code ({status}); results are unreliable")
+    timeout = max(seconds * timeout_factor, MIN_TIMEOUT)
+    print(f"Baseline test run took {seconds:.2f}s; per-mutant timeout is {timeout:.2f}s")
+    return timeout
+
+def prepare_modules(files, deduplicate=True, schemata=False):
+    """Read and enumerate the mutants of every file, as a package run needs them.
+
+    Returns (sources, catalogue, modules, dropped): {file: source},
+    {file: [mutations]}, {file: (source, schema or None)} as taken by
+    init_package_worker, and the number of equivalent or duplicate mutants
+    left out.
+    """
+    sources, catalogue, modules = {}, {}, {}
+    dropped = 0
+    for path in files:
+        with open(path, 'r') as f:
+            source = f.read()
+        with span("analyze.enumerate", file=path):
+            mutations = find_mutations(path, source)
+        if deduplicate:
+            with span("analyze.dedupe", file=path):
+                mutations, equivalent, duplicates = filter_equivalent(source, mutations, path)
+            dropped += len(equivalent) + len(duplicates)
+        sources[path], catalogue[path] = source, mutations
+        with span("analyze.schema", file=path):
+            modules[path] = (source, build_schema(source, mutations)[:2] if schemata else None)
+    return sources, catalogue, modules, dropped
+
+def analyze_package(targets, in_memory=False, jobs=1, coverage=False, warm=False, cache_file=None, fail_fast=False,
+                    history_file=None, timeout_factor=None, memory_limit=None, cpu_limit=None, deduplicate=True,
+                    schemata=False, sample=None, seed=DEFAULT_SEED, results_file=None, resume=False,
+                    chunk_size=PACKAGE_CHUNK, store_file=None):
+    """Test the mutants of every module named by `targets` in one run.
+
+    `targets` are files, directories or glob patterns (see mutation_targets).
+    The mutants of all modules share one schedule: they are cut into chunks
+    of at most `chunk_size` mutants of one module, and the chunks with the
+    highest estimated cost (the number of covering tests with `coverage`,
+    otherwise the number of mutants) go to the workers first, so that no
+    large module is left running alone at the end. A `sample` is drawn
+    from the mutants of all modules together, stratified by file as well
+    as operator and function. The other options work as in
+    analyze_mutations. Results are summarised per module and per package;
+    returns {file: [surviving mutations]}.
+    """
+    files = expand_targets(targets)
+    # Schema mutants are never written to disk
+    in_memory = in_memory or schemata
+    mode = " (warm worker)" if warm else " (in memory)" if in_memory else ""
+    mode += ", schemata" if schemata else ""
+    print(f"Analyzing mutations in {len(files)} module(s){mode} with {jobs} job(s)...")
+    
+    sources, catalogue, modules, dropped = prepare_modules(files, deduplicate, schemata)
+    mutations = [mutation for path in files for mutation in catalogue[path]]
+    print(f"Found {len(mutations)} mutant(s); dropped {dropped} equivalent or duplicate")
+    strata = None
+    if sample and mutations:
+        population = len(mutations)
+        mutations, strata = stratified_sample(sources, mutations, sample_size(sample, population), seed)
+        sampled = {mutation["id"] for mutation in mutations}
+        catalogue = {path: [m for m in catalogue[path] if m["id"] in sampled] for path in files}
+        print(f"Sampled {len(mutations)} of {population} mutant(s) from {len(strata)} strata (seed {seed})")
+    
+    line_map = None
+    if coverage and files:
+        with span("analyze.coverage_map"):
+            line_map = build_line_map(files)
+        print(f"Recorded test coverage for {sum(len(lines) for lines in line_map.values())} lines")
+    
+    store = run_id = None
+    functions = {}
+    if store_file:
+        store = ResultsStore(store_file)
+        run_id = store.start_run(files, {"jobs": jobs, "in_memory": in_memory, "warm": warm, "coverage": coverage,
+                                      "schemata": schemata, "sample": sample})
+        for path in files:
+            functions.update(function_names(sources[path], catalogue[path]))
+    
+    cache = None
+    keys = {}
+    if cache_file:
+        cache = StoreCache(store) if store else MutationCache(cache_file)
+        with span("analyze.cache_keys"):
+            for path in files:
+                keys.update(zip((m["id"] for m in catalogue[path]),
+                                mutation_keys(sources[path], catalogue[path], line_map)))
+    results = ResultsLog(results_file, sources, resume=resume) if results_file else None
+    
+    outcomes = {}
+    pending = []
+    for mutation in mutations:
+        cached = cache.get(keys[mutation["id"]]) if cache else None
+        if results and mutation["id"] in results.completed:
+            outcomes[mutation["id"]] = results.completed[mutation["id"]]["outcome"]
+        elif cached:
+            outcomes[mutation["id"]] = cached
+            if results:
+                results.write(mutation, cached, cached=True)
+            if store:
+                store.record(run_id, mutation, cached, cached=True, key=keys[mutation["id"]],
+                             function=functions[mutation["id"]])
+        else:
+            pending.append(mutation)
+    print(f"Reusing {len(outcomes)} outcome(s) from the cache or an earlier run, testing {len(pending)} mutant(s)")
+    
+    history = None
+    if history_file:
+        history = StoreHistory(store) if store else KillHistory(history_file)
+    rankings = {}
+    if history and fail_fast:
+        for mutation in pending:
+            location = mutation_location(mutation)
+            rankings[location] = history.ranking(location)
+    
+    tasks = schedule_mutants(pending, line_map, chunk_size)
+    executor = None
+    try:
+        if tasks and jobs > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=init_package_worker,
+                initargs=(modules, in_memory, True, line_map, warm, fail_fast, rankings)
+            )
+        elif tasks:
+            init_package_worker(modules, in_memory, False, line_map, warm, fail_fast, rankings)
+        
+        timeout = None
+        if tasks and timeout_factor:
+            timeout = calibrate_package_timeout(timeout_factor)
+        
+        limits = {"memory_mb": memory_limit, "cpu_seconds": cpu_limit} if memory_limit or cpu_limit else None
+        chunk_files = [file for file, _ in tasks]
+        chunks = [chunk for _, chunk in tasks]
+        run = executor.map if executor else map
+        chunk_outcomes = run(check_mutations, chunk_files, chunks, itertools.repeat(timeout), itertools.repeat(limits))
+        
+        for chunk, chunk_results in zip(chunks, chunk_outcomes):
+            for mutation, (outcome, killer, seconds) in zip(chunk, chunk_results):
+                outcomes[mutation["id"]] = outcome
+                print(f"{mutation['file']}:{mutation['line']}: {mutation['original']} -> {mutation['mutated']} "
+                      f"... {outcome}")
+                if cache:
+                    cache.put(keys[mutation["id"]], outcome)
+                if history and killer:
+                    history.record(mutation_location(mutation), killer)
+                if results:
+                    results.write(mutation, outcome, seconds, killer)
+                if store:
+                    store.record(run_id, mutation, outcome, seconds, killer, key=keys.get(mutation["id"]),
+                                 function=functions[mutation["id"]])
+    
+    finally:
+        if results:
+            results.close()
+        if cache:
+            cache.save()
+        if history:
+            history.save()
+        if store:
+            store.finish_run(run_id)
+            store.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        elif tasks:
+            _close_warm_servers()
     
-    # Print summary
+    print_package_summary(catalogue, outcomes)
+    if strata:
+        surviving = [m for m in mutations if outcomes.get(m["id"]) in (SURVIVED, NO_COVERAGE)]
+        score, low, high = estimate_score(strata, mutations, surviving)
+        print(f"Estimated mutation score: {score * 100:.2f}% (95% CI {low * 100:.2f}%-{high * 100:.2f}%)")
+    return {
+        path: [m for m in catalogue[path] if outcomes.get(m["id"]) in (SURVIVED, NO_COVERAGE)]
+        for path in files
+    }
+
+def print_package_summary(catalogue, outcomes):
+    """Print mutation scores per module and per package."""
+    packages = {}
+    rows = []
+    for path, mutations in catalogue.items():
+        surviving = sum(outcomes.get(m["id"]) in (SURVIVED, NO_COVERAGE) for m in mutations)
+        rows.append((path, len(mutations), surviving))
+        totals = packages.setdefault(package_name(path) or "(top level)", [0, 0])
+        totals[0] += len(mutations)
+        totals[1] += surviving
+    
+    def score(total, surviving):
+        return f"{(total - surviving) / total * 100:.2f}%" if total else "n/a"
+    
+    print("\n" + "="*50)
+    print("Mutation testing summary per module:")
+    for path, total, surviving in rows:
+        print(f"  {path}: {total} mutations, {surviving} surviving, score {score(total, surviving)}")
+    print("Per package:")
+    for package, (total, surviving) in sorted(packages.items()):
+        print(f"  {package}: {total} mutations, {surviving} surviving, score {score(total, surviving)}")
+    total = sum(row[1] for row in rows)
+    surviving = sum(row[2] for row in rows)
+    print(f"Overall mutation score: {score(total, surviving)} ({total} mutations, {surviving} surviving)")
+
+def print_summary(file_to_mutate, total_mutations, surviving_mutations, uncovered=0, timeouts=0, resource_kills=0,
+                  equivalent=0, duplicates=0):
+    """Print the mutation testing summary."""
     print("\n" + "="*50)
     print(f"Mutation testing summary for {file_to_mutate}:")
     print(f"Total mutations: {total_mutations}")
     print(f"Surviving mutations: {len(surviving_mutations)}")
+    if uncovered:
+        print(f"  of which without test coverage: {uncovered}")
+    if timeouts or resource_kills:
+        print(f"Killed by timeout: {timeouts}, by resource limit: {resource_kills}")
+    if equivalent or duplicates:
+        print(f"Not tested (not counted in the score): {equivalent} equivalent, {duplicates} duplicate")
     print(f"Mutation score: {((total_mutations - len(surviving_mutations)) / total_mutations * 100) if total_mutations else 0:.2f}%")
     
     if surviving_mutations:
         print("\nSurviving mutations that need additional test cases:")
         for i, mutation in enumerate(surviving_mutations, 1):
             print(f"{i}. Line {mutation['line']}: {mutation['original']} -> {mutation['mutated']}")
-    
-    return surviving_mutations
 
-def generate_test_case(mutation):
-    """Generate a test case to catch a specific mutation."""
+def generate_test_case(mutation, test_file="test_calculator.py"):
+    """Generate a test case to catch a specific mutation.
+
+    Inputs on which the mutant differs from the original are searched for
+    first, seeded with the literals of `test_file`; the templates below are
+    the fallback when none is found.
+    """
     file = mutation["file"]
     line = mutation["line"]
     original = mutation["original"]
@@ -164,7 +772,8 @@ def generate_test_case(mutation):
     
     # Extract the function name from the file
     with open(file, 'r') as f:
-        lines = f.readlines()
+        source = f.read()
+    lines = source_lines(source)
     
     # Find the function containing this line
     func_name = None
@@ -179,7 +788,11 @@ def generate_test_case(mutation):
         return None
     
     # Generate test name
-    test_name = f"test_{func_name}_mutation_{len(os.listdir())}"
+    test_name = f"test_{func_name}_{mutation['operator']}_line_{line}"
+    
+    test_case = differential_test(file, source, mutate_source(source, mutation), func_name, test_name, [test_file])
+    if test_case:
+        return test_case
     
     # Generate test based on the mutation type
     if '+' in pattern and '-' in replacement:
@@ -257,26 +870,112 @@ def {test_name}():
 """
 
 def add_test_cases_to_file(test_file, test_cases):
-    """Add generated test cases to the test file."""
-    with open(test_file, 'a') as f:
-        f.write("\n# Automatically generated tests for catching mutations\n")
-        for test_case in test_cases:
-            if test_case:
-                f.write(test_case)
-        f.write("\n")
+    """Add generated test cases to the test file in one write; return how many were added.
+
+    Tests that assert the same as an existing test are skipped, and taken
+    names get a numeric suffix.
+    """
+    index = SuiteIndex(test_file)
+    for test_case in test_cases:
+        if test_case:
+            index.add(test_case)
+    return index.flush(heading="# Automatically generated tests for catching mutations")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manual mutation testing")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="serve mutants through an import hook instead of rewriting the file")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of mutants to test in parallel, each worker in its own sandbox")
+    parser.add_argument("--coverage", action="store_true",
+                        help="run only the tests that cover each mutant, from one traced baseline run")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep a collected pytest session alive and fork it for every mutant")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_FILE,
+                        help="file that remembers mutant outcomes between runs (with --no-store)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-test every mutant and leave the cache untouched")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="stop each mutant's test run at the first failure, likely killers first")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE,
+                        help="file that counts which tests killed mutants at each line (with --no-store)")
+    parser.add_argument("--timeout-factor", type=float, default=5.0,
+                        help="per-mutant timeout as a multiple of the unmutated test run (0 disables)")
+    parser.add_argument("--memory-limit", type=int,
+                        help="address space limit per test run, in MiB")
+    parser.add_argument("--cpu-limit", type=int,
+                        help="CPU time limit per test run, in seconds")
+    parser.add_argument("--schemata", action="store_true",
+                        help="compile all mutants into one module and switch between them by number (with --warm)")
+    parser.add_argument("--sample",
+                        help="test a stratified random sample of the mutants, e.g. 10%% or 500")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="random seed for --sample")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE,
+                        help="JSON-lines file that receives one record per mutant as it finishes")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip mutants already recorded in the results file")
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE,
+                        help="SQLite database keeping every run's outcomes; also holds the cache and kill history")
+    parser.add_argument("--no-store", action="store_true",
+                        help="keep no results database; cache and history use their JSON files")
+    parser.add_argument("targets", nargs="*",
+                        help="files, directories or globs to mutate together (default: calculator.py only)")
+    parser.add_argument("--paths-from-config", action="store_true",
+                        help="mutate the paths_to_mutate configured for mutmut in setup.cfg")
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="time every phase and mutant; write a Chrome/Perfetto trace and print a summary")
+    args = parser.parse_args()
+    if args.schemata and not args.warm:
+        # Without a warm worker each mutant's run recompiles the whole schema module
+        parser.error("--schemata requires --warm")
+    
+    if args.profile:
+        mutation_profile.enable()
+        atexit.register(mutation_profile.disable)
+        atexit.register(mutation_profile.print_summary)
+        atexit.register(mutation_profile.write_trace, args.profile)
+    
     print("Starting manual mutation testing...")
+    if args.targets or args.paths_from_config:
+        analyze_package(args.targets or paths_to_mutate(), in_memory=args.in_memory, jobs=args.jobs,
+                        coverage=args.coverage, warm=args.warm, cache_file=None if args.no_cache else args.cache,
+                        fail_fast=args.fail_fast, history_file=args.history, timeout_factor=args.timeout_factor,
+                        memory_limit=args.memory_limit, cpu_limit=args.cpu_limit, schemata=args.schemata,
+                        sample=args.sample, seed=args.seed, results_file=args.results, resume=args.resume,
+                        store_file=None if args.no_store else args.store)
+        sys.exit(0)
+    
     file_to_mutate = "calculator.py"
     test_file = "test_calculator.py"
     
     # Run mutation analysis
-    surviving_mutations = analyze_mutations(file_to_mutate, test_file)
+    surviving_mutations = analyze_mutations(file_to_mutate, test_file, in_memory=args.in_memory, jobs=args.jobs,
+                                            coverage=args.coverage, warm=args.warm,
+                                            cache_file=None if args.no_cache else args.cache,
+                                            fail_fast=args.fail_fast, history_file=args.history,
+                                            timeout_factor=args.timeout_factor, memory_limit=args.memory_limit,
+                                            cpu_limit=args.cpu_limit, schemata=args.schemata,
+                                            sample=args.sample, seed=args.seed, results_file=args.results,
+                                            resume=args.resume, store_file=None if args.no_store else args.store)
     
-    # Generate and add test cases for surviving mutations
+    # Generate test cases for surviving mutations; keep only those that kill their mutant
     if surviving_mutations:
-        test_cases = [generate_test_case(mutation) for mutation in surviving_mutations]
-        add_test_cases_to_file(test_file, test_cases)
-        print(f"\nAdded {len([tc for tc in test_cases if tc])} new test cases to {test_file}")
+        with open(file_to_mutate, 'r') as f:
+            source = f.read()
+        candidates = []
+        for mutation in surviving_mutations:
+            test_case = generate_test_case(mutation, test_file)
+            if test_case:
+                candidates.append({"code": test_case, "mutated_source": mutate_source(source, mutation)})
+        with span("validate_tests", candidates=len(candidates)):
+            validation = validate_tests(file_to_mutate, source, candidates)
+        print(f"\n{summarize(validation)}")
+        for result in validation:
+            if not result["kills_mutant"]:
+                print(f"  Rejected {result['test']}: {result['error']}")
+        test_cases = [result["code"] for result in validation if result["kills_mutant"]]
+        added = add_test_cases_to_file(test_file, test_cases)
+        print(f"\nAdded {added} new test cases to {test_file}")
     else:
         print("\nNo surviving mutations found. Your tests are robust!") 
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Import hook that serves mutated module source from memory.
+
+A finder placed at the front of ``sys.meta_path`` claims a single module
+name and compiles the mutated source it was handed instead of the file on
+disk, so the file is never rewritten and no bytecode cache is invalidated.
+
+Run as a script it installs the hook and hands over to pytest:
+
+    python mutant_loader.py <module_name> <origin> [pytest args...] < mutant.py
+
+where the mutated source is read from stdin.
+"""
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+
+class MutantLoader(importlib.abc.Loader):
+    """Loader that executes mutated source held in memory."""
+
+    def __init__(self, source, origin):
+        self.source = source
+        self.origin = origin
+
+    def create_module(self, spec):
+        return None
+
+    def is_package(self, fullname):
+        # Lets spec_from_file_location set up __path__ for a package's __init__
+        return os.path.basename(self.origin) == "__init__.py"
+
+    def exec_module(self, module):
+        # Compile against the original path so tracebacks point at the real file
+        code = compile(self.source, self.origin, "exec", dont_inherit=True)
+        exec(code, module.__dict__)
+
+
+class MutantFinder(importlib.abc.MetaPathFinder):
+    """Finder that claims one module name and serves its mutated source."""
+
+    def __init__(self, module_name, source, origin):
+        self.module_name = module_name
+        self.loader = MutantLoader(source, origin)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != self.module_name:
+            return None
+        return importlib.util.spec_from_file_location(
+            fullname, self.loader.origin, loader=self.loader
+        )
+
+
+def install(module_name, source, origin):
+    """Serve `source` for `module_name` on every subsequent import."""
+    finder = MutantFinder(module_name, source, origin)
+    sys.meta_path.insert(0, finder)
+    sys.modules.pop(module_name, None)
+    return finder
+
+
+def uninstall(finder):
+    """Remove a previously installed finder and forget the mutated module."""
+    if finder in sys.meta_path:
+        sys.meta_path.remove(finder)
+    sys.modules.pop(finder.module_name, None)
+
+
+def main(argv):
+    """Install the hook for the source on stdin and run pytest."""
+    module_name, origin, pytest_args = argv[0], argv[1], argv[2:]
+    source = sys.stdin.read()
+
+    # Behave like `python -m pytest`: the project directory is importable and
+    # nothing compiled from the mutant is written back as a .pyc
+    sys.path.insert(0, os.getcwd())
+    sys.dont_write_bytecode = True
+
+    install(module_name, source, os.path.abspath(origin))
+
+    import pytest
+    return pytest.main(pytest_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
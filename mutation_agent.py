@@ -1,13 +1,70 @@
+import asyncio
 import os
 import re
+import shutil
+import shlex
+import signal
 import subprocess
 import sys
+import tempfile
 import platform
 from typing import List, Dict, Tuple
 
+import mutation_profile
+from candidate_validation import summarize, validate_tests
+from coverage_report import cov_arguments, load_json_report
+from differential_search import differential_test
+from manual_mutation_testing import create_sandbox
+from mutation_cache import MutationCache, find_test_files, hash_files
+from mutation_profile import span, traced
+from mutmut_cache import (KILLED_STATUSES, OUTCOMES, SURVIVED, apply_diff, count_statuses, load_mutants,
+                          mutant_diffs)
+from mutation_targets import expand_targets, paths_to_mutate
+from results_store import DEFAULT_STORE_FILE, ResultsStore, function_names
+from suite_index import SuiteIndex
+
 # Check if running on Windows
 IS_WINDOWS = platform.system() == 'Windows'
 
+# Remembers mutmut run results keyed by the hash of the mutated sources and tests
+MUTMUT_RUN_CACHE = ".mutmut_run_cache.json"
+
+# Where run_until_complete keeps the agent's state between iterations and restarts
+AGENT_STATE_FILE = ".mutation_agent_state.json"
+
+# Environment variable naming the results store of a direct run
+STORE_VARIABLE = "MUTATION_STORE"
+
+# The attributes that make up the agent's state, all JSON-serializable
+STATE_FIELDS = ("current_coverage", "calculator_coverage", "current_mutations_killed", "total_mutations",
+                "failed_mutations", "coverage_data", "tests_added", "new_tests")
+
+# Seconds a phase may run before its subprocess is killed
+PHASE_TIMEOUTS = {"coverage": 600, "mutmut": 3600, "retest": 300}
+
+async def run_command(command, timeout=None, cwd=None):
+    """Run `command` as an asyncio subprocess and return a CompletedProcess.
+
+    The process is killed if `timeout` expires (asyncio.TimeoutError is
+    raised) or if the awaiting task is cancelled.
+    """
+    # A session of its own lets a timeout take down the whole process tree
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=cwd,
+        start_new_session=not IS_WINDOWS
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException:
+        if process.returncode is None:
+            if IS_WINDOWS:
+                process.kill()
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+        raise
+    return subprocess.CompletedProcess(command, process.returncode, stdout.decode(), stderr.decode())
+
 # Simple local implementations instead of Google ADK
 class ActionInput:
     def __init__(self, content=None):
@@ -34,51 +91,117 @@ class Agent:
 class MutationTestingAgent(Agent):
     """Agent for running mutation tests and improving test coverage."""
     
-    def __init__(self):
+    def __init__(self, store_file=DEFAULT_STORE_FILE):
         super().__init__()
+        # Results store every mutmut run is recorded in; None records nothing
+        self.store_file = store_file
         self.current_coverage = 0.0
         self.calculator_coverage = 0.0
         self.target_coverage = 100.0
         self.current_mutations_killed = 0
         self.total_mutations = 0
         self.failed_mutations = []
+        # Tests appended by the last improve_tests
+        self.tests_added = 0
+        # pytest node ids of the tests appended by the last improve_tests
+        self.new_tests = []
+        # Every mutant of the last mutmut run, read from its cache once per cycle
+        self.mutants = []
+        # Per-file and per-line coverage of the mutated paths (see coverage_report)
+        self.coverage_data = {"files": {}, "total": {"statements": 0, "missing": 0, "percent": 0.0}}
+        self.run_cache = MutationCache(MUTMUT_RUN_CACHE)
+    
+    def get_state(self) -> Dict:
+        """Return the agent's state as a JSON-serializable dict."""
+        return {field: getattr(self, field) for field in STATE_FIELDS}
+    
+    def set_state(self, state: Dict):
+        """Restore state returned by get_state."""
+        for field in STATE_FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
+    
+    def is_complete(self) -> bool:
+        """Whether the coverage target is met and, where mutmut runs, every mutant is killed."""
+        if self.calculator_coverage < self.target_coverage:
+            return False
+        return IS_WINDOWS or self.current_mutations_killed == self.total_mutations
+    
+    def progress(self) -> Dict:
+        """Return the outcome of the last cycle as numbers."""
+        return {
+            "coverage": self.current_coverage,
+            "calculator_coverage": self.calculator_coverage,
+            "killed": self.current_mutations_killed,
+            "total": self.total_mutations,
+            "survivors": len(self.failed_mutations),
+            "tests_added": self.tests_added,
+            "complete": self.is_complete(),
+        }
         
     @function
     def run_coverage(self, action_input: ActionInput) -> ActionResponse:
         """Run pytest with coverage."""
+        return asyncio.run(self.run_coverage_async(action_input))
+    
+    async def run_coverage_async(self, action_input: ActionInput, snapshot=False) -> ActionResponse:
+        """Run pytest with coverage as an asyncio subprocess.
+
+        Only the paths to mutate are measured, and the figures are read from
+        coverage's JSON report into `self.coverage_data`.
+        With `snapshot=True` the tests run on a copy of the project, so that a
+        concurrent mutmut run mutating files in place cannot affect them.
+        """
+        cwd = None
+        report_fd, report = tempfile.mkstemp(prefix="coverage-", suffix=".json")
+        os.close(report_fd)
         try:
-            result = subprocess.run(
-                [sys.executable, "-m", "pytest", "--cov=.", "--cov-report=term"], 
-                capture_output=True, 
-                text=True,
-                check=False
-            )
-            
-            # Extract overall coverage percentage
-            coverage_match = re.search(r'TOTAL\s+\d+\s+\d+\s+(\d+)%', result.stdout)
-            if coverage_match:
-                self.current_coverage = float(coverage_match.group(1))
-                
-                # Extract coverage for calculator.py specifically
-                calculator_match = re.search(r'calculator\.py\s+(\d+)\s+(\d+)\s+(\d+)%', result.stdout)
-                if calculator_match:
-                    stmts = int(calculator_match.group(1))
-                    miss = int(calculator_match.group(2))
-                    self.calculator_coverage = float(calculator_match.group(3))
-                    
-                return ActionResponse(
-                    content=f"Current test coverage: {self.current_coverage}%\nCalculator module coverage: {self.calculator_coverage}%\n{result.stdout}"
+            # Copied before the first await, so before a concurrent mutmut starts
+            cwd = create_sandbox(os.getcwd()) if snapshot else None
+            targets = paths_to_mutate()
+            with span("agent.run_coverage"):
+                result = await run_command(
+                    [sys.executable, "-m", "pytest", *cov_arguments(targets), f"--cov-report=json:{report}"],
+                    timeout=PHASE_TIMEOUTS["coverage"],
+                    cwd=cwd
                 )
-            else:
+            
+            if not os.path.getsize(report):
                 return ActionResponse(
                     content=f"Failed to extract coverage information.\n{result.stdout}\n{result.stderr}"
                 )
+            self.coverage_data = load_json_report(report, expand_targets(targets))
+            files = self.coverage_data["files"]
+            self.current_coverage = self.coverage_data["total"]["percent"]
+            self.calculator_coverage = files.get("calculator.py", self.coverage_data["total"])["percent"]
+            
+            details = [
+                f"{name}: {data['statements']} statements, {data['missing']} missing ({data['percent']:.2f}%)"
+                + (f", missing lines {', '.join(map(str, data['missing_lines']))}" if data["missing_lines"] else "")
+                for name, data in files.items()
+            ]
+            return ActionResponse(
+                content=(
+                    f"Current test coverage: {self.current_coverage}%\n"
+                    f"Calculator module coverage: {self.calculator_coverage}%\n" + "\n".join(details)
+                )
+            )
+        except asyncio.TimeoutError:
+            return ActionResponse(content=f"Coverage run timed out after {PHASE_TIMEOUTS['coverage']}s")
         except Exception as e:
             return ActionResponse(content=f"Error running coverage: {str(e)}")
+        finally:
+            if cwd:
+                shutil.rmtree(cwd, ignore_errors=True)
+            os.remove(report)
     
     @function
     def run_mutmut(self, action_input: ActionInput) -> ActionResponse:
         """Run mutmut to find mutations."""
+        return asyncio.run(self.run_mutmut_async(action_input))
+    
+    async def run_mutmut_async(self, action_input: ActionInput) -> ActionResponse:
+        """Run mutmut as an asyncio subprocess."""
         if IS_WINDOWS:
             return ActionResponse(
                 content="Mutmut is not fully compatible with Windows due to missing 'resource' module. "
@@ -86,39 +209,84 @@ class MutationTestingAgent(Agent):
             )
             
         try:
+            # Skip the run entirely when neither the mutated code nor the tests changed
+            run_key = hash_files(expand_targets(paths_to_mutate()) + find_test_files())
+            cached = self.run_cache.get(run_key)
+            if cached:
+                self.total_mutations = cached["total"]
+                self.current_mutations_killed = cached["killed"]
+                return ActionResponse(
+                    content=(
+                        f"Mutation testing results (cached, sources and tests unchanged):\n"
+                        f"Total mutations: {self.total_mutations}\n"
+                        f"Killed mutations: {self.current_mutations_killed}\n"
+                        f"Mutation score: {self.current_mutations_killed/self.total_mutations*100:.2f}%\n"
+                    )
+                )
+            
             # First, run mutmut
-            result = subprocess.run(
-                [sys.executable, "-m", "mutmut", "run"], 
-                capture_output=True, 
-                text=True,
-                check=False
-            )
+            with span("agent.run_mutmut"):
+                result = await run_command([sys.executable, "-m", "mutmut", "run"], timeout=PHASE_TIMEOUTS["mutmut"])
             
-            # Parse the results
-            mutations_match = re.search(r'(\d+) mutations were generated', result.stdout)
-            killed_match = re.search(r'(\d+) of them were killed', result.stdout)
+            # Read the outcome of every mutant from mutmut's cache
+            self.mutants = load_mutants()
             
-            if mutations_match and killed_match:
-                self.total_mutations = int(mutations_match.group(1))
-                self.current_mutations_killed = int(killed_match.group(1))
+            if self.mutants:
+                counts = count_statuses(self.mutants)
+                self.total_mutations = len(self.mutants)
+                self.current_mutations_killed = sum(counts.get(status, 0) for status in KILLED_STATUSES)
+                self.run_cache.put(run_key, {"total": self.total_mutations, "killed": self.current_mutations_killed})
+                self.run_cache.save()
+                if self.store_file:
+                    self.record_mutmut_run()
                 
                 return ActionResponse(
                     content=(
                         f"Mutation testing results:\n"
                         f"Total mutations: {self.total_mutations}\n"
                         f"Killed mutations: {self.current_mutations_killed}\n"
-                        f"Mutation score: {self.current_mutations_killed/self.total_mutations*100:.2f}%\n\n"
-                        f"{result.stdout}"
+                        f"Mutation score: {self.current_mutations_killed/self.total_mutations*100:.2f}%\n"
+                        f"Statuses: {', '.join(f'{status}={count}' for status, count in sorted(counts.items()))}\n"
                     )
                 )
             else:
                 return ActionResponse(
                     content=f"Failed to extract mutation information.\n{result.stdout}\n{result.stderr}"
                 )
+        except asyncio.TimeoutError:
+            return ActionResponse(content=f"Mutmut run timed out after {PHASE_TIMEOUTS['mutmut']}s")
         except Exception as e:
             return ActionResponse(content=f"Error running mutmut: {str(e)}")
     
+    def record_mutmut_run(self):
+        """Keep the outcomes of the last mutmut run in the results store.
+
+        A store that cannot be written is reported and otherwise ignored; the
+        run's results do not depend on it.
+        """
+        try:
+            store = ResultsStore(self.store_file)
+        except Exception as e:
+            print(f"Warning: could not record the mutmut run in {self.store_file}: {e}")
+            return
+        try:
+            run_id = store.start_run(sorted({mutant["file"] for mutant in self.mutants}), {"engine": "mutmut"})
+            records = [dict(mutant, id=f"mutmut:{mutant['id']}") for mutant in self.mutants]
+            functions = {}
+            for file in {mutant["file"] for mutant in records}:
+                with open(file, 'r') as f:
+                    functions.update(function_names(f.read(), [m for m in records if m["file"] == file]))
+            for record in records:
+                store.record(run_id, record, OUTCOMES.get(record["status"], record["status"]),
+                             function=functions[record["id"]])
+            store.finish_run(run_id)
+        except Exception as e:
+            print(f"Warning: could not record the mutmut run in {self.store_file}: {e}")
+        finally:
+            store.close()
+    
     @function
+    @traced("agent.find_surviving_mutations")
     def find_surviving_mutations(self, action_input: ActionInput) -> ActionResponse:
         """Find and analyze surviving mutations."""
         if IS_WINDOWS:
@@ -127,26 +295,27 @@ class MutationTestingAgent(Agent):
             )
             
         try:
-            # Get list of surviving mutations
-            result = subprocess.run(
-                [sys.executable, "-m", "mutmut", "results"], 
-                capture_output=True, 
-                text=True,
-                check=False
-            )
-            
-            surviving_mutations = result.stdout.strip().split('\n')
+            # One read of mutmut's cache gives the status of every mutant
+            self.mutants = load_mutants()
+            surviving_mutations = [mutant for mutant in self.mutants if mutant["status"] == SURVIVED]
             self.failed_mutations = surviving_mutations
             
+            listing = "\n".join(
+                f"{mutant['id']}: {mutant['file']}:{mutant['line']}: {mutant['source_line'].strip()}"
+                for mutant in surviving_mutations
+            )
             return ActionResponse(
-                content=f"Found {len(surviving_mutations)} surviving mutations:\n{result.stdout}"
+                content=f"Found {len(surviving_mutations)} surviving mutations:\n{listing}"
             )
         except Exception as e:
             return ActionResponse(content=f"Error finding surviving mutations: {str(e)}")
     
     @function
+    @traced("agent.improve_tests")
     def improve_tests(self, action_input: ActionInput) -> ActionResponse:
         """Improve tests based on surviving mutations."""
+        self.tests_added = 0
+        self.new_tests = []
         if IS_WINDOWS:
             # On Windows, we'll use a more basic approach to improve tests
             # Analyze the calculator.py file directly and generate additional tests
@@ -156,53 +325,126 @@ class MutationTestingAgent(Agent):
             return ActionResponse(content="No surviving mutations to fix.")
         
         improvements = []
+        sources = {}
+        candidates = {}
+        without_diff = 0
+        
+        # Diffs of all survivors at once, without a `mutmut show` process each
+        with span("agent.mutant_diffs", mutants=len(self.failed_mutations)):
+            diffs = mutant_diffs(self.failed_mutations)
         
-        for mutation_id in self.failed_mutations[:5]:  # Process first 5 mutations
+        for mutation in self.failed_mutations:
             try:
-                # Show the mutation
-                result = subprocess.run(
-                    [sys.executable, "-m", "mutmut", "show", mutation_id], 
-                    capture_output=True, 
-                    text=True,
-                    check=False
-                )
-                
-                mutation_info = result.stdout
+                mutation_info = diffs[mutation["id"]]
+                if mutation_info is None:
+                    # Nothing to generate or validate against without the mutant's diff
+                    without_diff += 1
+                    continue
+                file_name = os.path.basename(mutation["file"])
                 
-                # Extract file and line information
-                file_match = re.search(r'--- (\w+\.py)', mutation_info)
-                if not file_match:
+                if mutation["file"] not in sources:
+                    with open(mutation["file"], 'r') as f:
+                        sources[mutation["file"]] = f.read()
+                mutated_source = apply_diff(sources[mutation["file"]], mutation_info)
+                if mutated_source is None:
                     continue
-                    
-                file_name = file_match.group(1)
                 
-                # Generate improved test for this mutation
-                improved_test = self._generate_test_for_mutation(file_name, mutation_info)
+                # Generate improved test for this mutation: inputs on which the
+                # mutant differs if any are found, the templates otherwise
+                improved_test = None
+                func_match = re.search(r'def (\w+)\(', mutation_info)
+                if func_match:
+                    func_name = func_match.group(1)
+                    improved_test = differential_test(
+                        mutation["file"], sources[mutation["file"]], mutated_source, func_name,
+                        f"test_{func_name}_mutant_{mutation['id']}", [f"test_{file_name}"]
+                    )
+                improved_test = improved_test or self._generate_test_for_mutation(file_name, mutation_info)
                 if improved_test:
-                    improvements.append((file_name, improved_test))
+                    candidates.setdefault(mutation["file"], []).append(
+                        {"code": improved_test, "mutated_source": mutated_source}
+                    )
             except Exception as e:
                 continue
         
+        # Keep only tests that pass on the original code and fail on their mutant
+        validation = []
+        with span("agent.validate_tests", candidates=sum(map(len, candidates.values()))):
+            for file, batch in candidates.items():
+                results = validate_tests(file, sources[file], batch)
+                validation += results
+                improvements += [(os.path.basename(file), result["code"]) for result in results if result["kills_mutant"]]
+        
         # Apply improvements to test files
+        self._write_tests(improvements)
+        
+        content = f"Improved {self.tests_added} tests based on surviving mutations.\n{summarize(validation)}"
+        if without_diff:
+            content += f"\nSkipped {without_diff} survivors without a diff (mutmut could not be imported)"
+        return ActionResponse(content=content)
+    
+    def _write_tests(self, improvements):
+        """Append new, non-duplicate tests to test_<file>, in one write per test file."""
+        indexes = {}
         for file_name, improved_test in improvements:
             test_file_name = f"test_{file_name}"
+            if test_file_name not in indexes:
+                # A new test file starts with the module's imports
+                module_name = file_name.replace('.py', '')
+                indexes[test_file_name] = SuiteIndex(test_file_name, preamble=f"import pytest\nfrom {module_name} import *\n")
             
-            # Check if test file exists
-            if os.path.exists(test_file_name):
-                with open(test_file_name, 'r') as f:
-                    content = f.read()
-                
-                # Append the new test
-                with open(test_file_name, 'a') as f:
-                    f.write("\n\n" + improved_test)
-            else:
-                # Create a new test file
-                with open(test_file_name, 'w') as f:
-                    module_name = file_name.replace('.py', '')
-                    f.write(f"import pytest\nfrom {module_name} import *\n\n{improved_test}")
+            # Duplicates of existing tests are dropped, taken names get a suffix
+            name = indexes[test_file_name].add(improved_test)
+            if name:
+                self.new_tests.append(f"{test_file_name}::{name}")
+        
+        for index in indexes.values():
+            self.tests_added += index.flush()
+    
+    @function
+    def retest_survivors(self, action_input: ActionInput) -> ActionResponse:
+        """Re-run only the surviving mutants, against the tests just added."""
+        return asyncio.run(self.retest_survivors_async(action_input))
+    
+    async def retest_survivors_async(self, action_input: ActionInput) -> ActionResponse:
+        """Re-test `failed_mutations` with `mutmut run <id>` and only the new tests.
+        
+        The old tests are unchanged and already let these mutants survive, so
+        the new tests alone decide whether they are killed now. mutmut updates
+        its cache, and the kill counts are updated from it without a full run.
+        """
+        if IS_WINDOWS or not self.failed_mutations or not self.new_tests:
+            return ActionResponse(content="No new tests to re-test surviving mutations against.")
+        
+        runner = shlex.join([sys.executable, "-m", "pytest", "-x", "-q", *self.new_tests])
+        try:
+            for mutation in self.failed_mutations:
+                with span("agent.retest", mutant=mutation["id"]):
+                    await run_command(
+                        [sys.executable, "-m", "mutmut", "run", str(mutation["id"]), "--runner", runner],
+                        timeout=PHASE_TIMEOUTS["retest"]
+                    )
+        except asyncio.TimeoutError:
+            return ActionResponse(content=f"Re-testing a mutant timed out after {PHASE_TIMEOUTS['retest']}s")
+        except Exception as e:
+            return ActionResponse(content=f"Error re-testing surviving mutations: {str(e)}")
+        
+        self.mutants = load_mutants()
+        statuses = {mutant["id"]: mutant["status"] for mutant in self.mutants}
+        killed = [mutation for mutation in self.failed_mutations if statuses.get(mutation["id"]) in KILLED_STATUSES]
+        self.failed_mutations = [mutation for mutation in self.failed_mutations if statuses.get(mutation["id"]) == SURVIVED]
+        self.current_mutations_killed += len(killed)
+        
+        # The next cycle finds these counts for the new tests instead of running mutmut again
+        run_key = hash_files(expand_targets(paths_to_mutate()) + find_test_files())
+        self.run_cache.put(run_key, {"total": self.total_mutations, "killed": self.current_mutations_killed})
+        self.run_cache.save()
         
         return ActionResponse(
-            content=f"Improved {len(improvements)} tests based on surviving mutations."
+            content=(
+                f"Re-tested {len(killed) + len(self.failed_mutations)} surviving mutations against "
+                f"{len(self.new_tests)} new tests: {len(killed)} killed, {len(self.failed_mutations)} still surviving."
+            )
         )
     
     def _improve_tests_windows(self) -> ActionResponse:
@@ -227,26 +469,10 @@ class MutationTestingAgent(Agent):
                     improvements.append(('calculator.py', improved_test))
                     
             # Apply improvements to test files
-            for file_name, improved_test in improvements:
-                test_file_name = f"test_{file_name}"
-                
-                # Check if test file exists
-                if os.path.exists(test_file_name):
-                    with open(test_file_name, 'r') as f:
-                        content = f.read()
-                    
-                    # Append the new test if it doesn't already exist
-                    if improved_test not in content:
-                        with open(test_file_name, 'a') as f:
-                            f.write("\n\n" + improved_test)
-                else:
-                    # Create a new test file
-                    with open(test_file_name, 'w') as f:
-                        module_name = file_name.replace('.py', '')
-                        f.write(f"import pytest\nfrom {module_name} import *\n\n{improved_test}")
+            self._write_tests(improvements)
             
             return ActionResponse(
-                content=f"Improved {len(improvements)} tests based on direct code analysis."
+                content=f"Improved {self.tests_added} tests based on direct code analysis."
             )
                 
         except Exception as e:
@@ -324,7 +550,9 @@ def test_{0}_additional():
         mutated_line = ""
         
         for i, line in enumerate(mutation_lines):
-            if line.startswith('-'):
+            if line.startswith(('---', '+++')):
+                continue
+            elif line.startswith('-'):
                 original_line = line[1:].strip()
             elif line.startswith('+') and original_line:
                 mutated_line = line[1:].strip()
@@ -370,13 +598,18 @@ def test_{func_name}_mutation_catch():
 """
     
     @function
+    @traced("agent.run_full_cycle")
     def run_full_cycle(self, action_input: ActionInput) -> ActionResponse:
         """Run a full cycle of coverage check, mutation testing, and test improvement."""
-        # Run coverage check
-        coverage_response = self.run_coverage(action_input)
-        
-        # Run mutation testing
-        mutation_response = self.run_mutmut(action_input)
+        return asyncio.run(self.run_full_cycle_async(action_input))
+    
+    async def run_full_cycle_async(self, action_input: ActionInput) -> ActionResponse:
+        """Run a full cycle, overlapping the independent coverage and mutmut runs."""
+        # Coverage runs on a snapshot so that mutmut's in-place mutants never reach it
+        coverage_response, mutation_response = await asyncio.gather(
+            self.run_coverage_async(action_input, snapshot=True),
+            self.run_mutmut_async(action_input)
+        )
         
         # Find surviving mutations
         surviving_response = self.find_surviving_mutations(action_input)
@@ -384,19 +617,20 @@ def test_{func_name}_mutation_catch():
         # Improve tests
         improvement_response = self.improve_tests(action_input)
         
-        # Check if calculator module has 100% coverage
-        if self.calculator_coverage >= self.target_coverage:
+        # Re-test only the survivors, against only the tests just added
+        retest_response = await self.retest_survivors_async(action_input)
+        
+        # Check if calculator module has 100% coverage (and, off Windows, no surviving mutant)
+        if self.is_complete():
             if not IS_WINDOWS:
-                # On non-Windows, also check mutation score
-                if self.current_mutations_killed == self.total_mutations:
-                    return ActionResponse(
-                        content=(
-                            f"SUCCESS! Achieved {self.calculator_coverage}% coverage for calculator module and killed "
-                            f"all {self.total_mutations} mutations.\n\n"
-                            f"Coverage details:\n{coverage_response.content}\n\n"
-                            f"Mutation details:\n{mutation_response.content}"
-                        )
+                return ActionResponse(
+                    content=(
+                        f"SUCCESS! Achieved {self.calculator_coverage}% coverage for calculator module and killed "
+                        f"all {self.total_mutations} mutations.\n\n"
+                        f"Coverage details:\n{coverage_response.content}\n\n"
+                        f"Mutation details:\n{mutation_response.content}"
                     )
+                )
             else:
                 # On Windows, just check coverage
                 return ActionResponse(
@@ -422,11 +656,22 @@ def test_{func_name}_mutation_catch():
             content_parts.append(f"Mutation details:\n{mutation_response.content}\n\n")
             
         content_parts.append(f"Improvements made:\n{improvement_response.content}\n\n")
+        if not IS_WINDOWS:
+            content_parts.append(f"Re-test of surviving mutations:\n{retest_response.content}\n\n")
         content_parts.append(f"Run again to continue improving test coverage.")
         
         return ActionResponse(content="".join(content_parts))
 
 # Main entry point
 if __name__ == "__main__":
-    agent = MutationTestingAgent()
-    agent.run() 
\ No newline at end of file
+    # MUTATION_TRACE=trace.json profiles the cycle into a Chrome/Perfetto trace
+    trace_file = os.environ.get(mutation_profile.TRACE_VARIABLE)
+    if trace_file:
+        mutation_profile.enable()
+    # MUTATION_STORE=results.db picks the results store; an empty value disables it
+    agent = MutationTestingAgent(os.environ.get(STORE_VARIABLE, DEFAULT_STORE_FILE) or None)
+    agent.run()
+    if trace_file:
+        mutation_profile.write_trace(trace_file)
+        mutation_profile.print_summary()
+        mutation_profile.disable() 
\ No newline at end of file
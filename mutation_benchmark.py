@@ -0,0 +1,348 @@
+"""
+Benchmark the mutation engines on synthetic modules of increasing size.
+
+For every size a scratch project is generated: a calculator.py with that
+many functions in the style of the real one, and a test_calculator.py
+that pins each function's results, so that most mutants are killed. The
+project lives in a temporary directory so that the repository's own test
+run never picks up the generated tests. Each size runs in a fresh
+interpreter, which keeps the peak RSS figures apart.
+
+Per size the manual engine reports:
+
+- enumerate: finding every mutant (parse + AST walk),
+- dedupe: bytecode equivalence filtering of the tested sample,
+- coverage: the traced baseline run that maps lines to tests,
+- execution: running the tests against the sampled mutants, and the
+  resulting mutants/second,
+- io: writing each mutant to disk and restoring the original, as the
+  on-disk mode does,
+- peak RSS of the benchmark and its test processes.
+
+Large modules have far more mutants than can be tested in a benchmark, so
+a fixed-seed stratified sample of `--mutants` of them is executed.
+With --agent the phases of MutationTestingAgent.run_full_cycle are timed
+too, when mutmut and pytest-cov are installed.
+
+Results can be stored as a baseline and later runs compared against it;
+the baseline records the mode, sample size and seed it was measured with,
+and runs with other settings are not compared against it:
+
+    python mutation_benchmark.py --save-baseline
+    python mutation_benchmark.py --threshold 0.2   # exit 1 on a >20% regression
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_MUTANTS = 100
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.2
+
+# Timings below this many seconds are too noisy to call a regression
+NOISE_FLOOR = 0.05
+
+# Metrics where a larger value is worse; mutants_per_s is the one where it is better
+COSTS = ("enumerate_s", "dedupe_s", "coverage_s", "execution_s", "io_s", "peak_rss_mb")
+THROUGHPUT = ("mutants_per_s",)
+
+TARGET = "calculator.py"
+TEST_FILE = "test_calculator.py"
+
+# Function bodies cycle through these so every operator group is exercised
+TEMPLATES = (
+    '''def f{i}(a, b):
+    """Synthetic function {i}"""
+    if a > b:
+        return a - b + {k}
+    return b * 2 - a
+''',
+    '''def f{i}(a, b):
+    """Synthetic function {i}"""
+    if a == 0 or b == 0:
+        return 0
+    return a % b + {k}
+''',
+    '''def f{i}(n):
+    """Synthetic function {i}"""
+    if n < 0:
+        raise ValueError("negative")
+    total = 0
+    for j in range(n):
+        total += j * {k}
+    return total
+''',
+    '''def f{i}(a, b):
+    """Synthetic function {i}"""
+    return not (a >= b) and a != {k}
+''',
+)
+PAIRS = ((3, 1), (1, 3), (0, 5), (4, 4), (-2, 7))
+COUNTS = (0, 1, 4)
+
+
+def generate_module(functions):
+    """Return the source of a synthetic module with `functions` functions."""
+    return "\n".join(TEMPLATES[i % len(TEMPLATES)].format(i=i, k=i % 7 + 2) for i in range(functions))
+
+
+def generate_tests(source, functions):
+    """Return a test module asserting the results `source` computes."""
+    namespace = {}
+    exec(compile(source, TARGET, "exec"), namespace)
+    parts = ["import pytest", "import calculator", ""]
+    for i in range(functions):
+        function = namespace[f"f{i}"]
+        lines = [f"def test_f{i}():"]
+        if i % len(TEMPLATES) == 2:
+            lines += [f"    assert calculator.f{i}({n}) == {function(n)!r}" for n in COUNTS]
+            lines += ["    with pytest.raises(ValueError):", f"        calculator.f{i}(-1)"]
+        else:
+            lines += [f"    assert calculator.f{i}({a}, {b}) == {function(a, b)!r}" for a, b in PAIRS]
+        parts.append("\n".join(lines) + "\n")
+    return "\n".join(parts)
+
+
+def write_project(functions, directory):
+    """Write the synthetic module and its tests into `directory`."""
+    source = generate_module(functions)
+    with open(os.path.join(directory, TARGET), "w") as f:
+        f.write(source)
+    with open(os.path.join(directory, TEST_FILE), "w") as f:
+        f.write(generate_tests(source, functions))
+    with open(os.path.join(directory, "setup.cfg"), "w") as f:
+        f.write(f"[mutmut]\npaths_to_mutate={TARGET}\nbackup=False\nrunner=pytest\ntests_dir=.\n")
+    return source
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process or any waited-for child, in MiB."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Timer:
+    """Accumulate wall-clock seconds per phase."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def bench_manual(functions, mode, mutants, seed):
+    """Benchmark the manual engine on one size in the current directory."""
+    import manual_mutation_testing as engine
+    from coverage_map import build_line_map
+    from mutation_operators import filter_equivalent, find_mutations, mutate_source
+    from mutation_sampling import stratified_sample
+
+    timer = Timer()
+    source = write_project(functions, ".")
+    with timer.phase("enumerate_s"):
+        catalogue = find_mutations(TARGET, source)
+    sample, _ = stratified_sample(source, catalogue, min(mutants, len(catalogue)), seed)
+    with timer.phase("dedupe_s"):
+        sample, _, _ = filter_equivalent(source, sample, TARGET)
+    with timer.phase("coverage_s"):
+        line_map = build_line_map([TARGET])
+
+    engine.init_worker(TARGET, source, mode != "disk", False, line_map, warm=mode == "warm")
+    try:
+        with timer.phase("execution_s"):
+            outcomes = [engine.check_mutation(mutation)[0] for mutation in sample]
+    finally:
+        engine._close_warm_servers()
+
+    with timer.phase("io_s"):
+        for mutation in sample:
+            with open(TARGET, "w") as f:
+                f.write(mutate_source(source, mutation))
+            with open(TARGET, "w") as f:
+                f.write(source)
+
+    result = dict(timer.phases)
+    result.update(
+        functions=functions,
+        mutants=len(catalogue),
+        tested=len(sample),
+        killed=sum(outcome != engine.SURVIVED and outcome != engine.NO_COVERAGE for outcome in outcomes),
+        mutants_per_s=len(sample) / result["execution_s"] if result["execution_s"] else None,
+    )
+    return result
+
+
+def bench_agent():
+    """Time each phase of MutationTestingAgent.run_full_cycle in the current directory."""
+    missing = [name for name in ("mutmut", "pytest_cov") if importlib.util.find_spec(name) is None]
+    if missing:
+        return {"skipped": f"not installed: {', '.join(missing)}"}
+
+    from mutation_agent import ActionInput, MutationTestingAgent
+    agent = MutationTestingAgent()
+    timer = Timer()
+    action_input = ActionInput()
+    for phase in ("run_coverage", "run_mutmut", "find_surviving_mutations", "improve_tests"):
+        with timer.phase(f"agent_{phase}_s"):
+            getattr(agent, phase)(action_input)
+    return timer.phases
+
+
+def run_size(functions, mode, mutants, seed, agent):
+    """Benchmark one size in a scratch directory and return its metrics."""
+    workdir = tempfile.mkdtemp(prefix="mutation-benchmark-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        # The engines narrate every mutant; only the numbers matter here
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = bench_manual(functions, mode, mutants, seed)
+            if agent:
+                result.update(bench_agent())
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, mode="warm", mutants=DEFAULT_MUTANTS, seed=0, agent=False):
+    """Benchmark every size, each in its own interpreter; return {size: metrics}."""
+    results = {}
+    for functions in sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--one", str(functions), "--mode", mode,
+                   "--mutants", str(mutants), "--seed", str(seed), *(["--agent"] if agent else [])]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+        results[str(functions)] = json.loads(completed.stdout.splitlines()[-1])
+        print_result(results[str(functions)])
+    return results
+
+
+def _format(value, unit=""):
+    if value is None:
+        return "n/a"
+    return f"{value:.2f}{unit}" if isinstance(value, float) else f"{value}{unit}"
+
+
+def print_result(result):
+    print(f"{result['functions']:>6} functions: {result['mutants']} mutants, {result['tested']} tested "
+          f"({result['killed']} killed) | enumerate {_format(result['enumerate_s'], 's')}, "
+          f"dedupe {_format(result['dedupe_s'], 's')}, coverage {_format(result['coverage_s'], 's')}, "
+          f"execution {_format(result['execution_s'], 's')} ({_format(result['mutants_per_s'])} mutants/s), "
+          f"io {_format(result['io_s'], 's')} | peak RSS {_format(result['peak_rss_mb'], ' MiB')}")
+    agent = {key: value for key, value in result.items() if key.startswith("agent_")}
+    if agent:
+        print("        agent: " + ", ".join(f"{key[6:-2]} {_format(value, 's')}" for key, value in agent.items()))
+    elif "skipped" in result:
+        print(f"        agent skipped ({result['skipped']})")
+
+
+def settings_mismatch(settings, baseline):
+    """Return a description of every setting in which `baseline` differs from `settings`."""
+    recorded = baseline.get("settings")
+    if recorded is None:
+        return ["the baseline records no settings"]
+    return [f"{name} {recorded.get(name)!r} in the baseline, {value!r} now"
+            for name, value in settings.items() if recorded.get(name) != value]
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return a description of every metric that regressed by more than `threshold`."""
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get(size)
+        if not reference:
+            continue
+        for metric in COSTS + THROUGHPUT + tuple(key for key in result if key.startswith("agent_")):
+            old, new = reference.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if metric in THROUGHPUT:
+                worse = new < old * (1 - threshold)
+            else:
+                noisy = metric.endswith("_s") and max(old, new) < NOISE_FLOOR
+                worse = not noisy and new > old * (1 + threshold)
+            if worse:
+                regressions.append(f"{size} functions: {metric} {_format(old)} -> {_format(new)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the mutation engines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="numbers of functions in the synthetic modules")
+    parser.add_argument("--mode", choices=("warm", "in-memory", "disk"), default="warm",
+                        help="how the manual engine runs the tests against each mutant")
+    parser.add_argument("--mutants", type=int, default=DEFAULT_MUTANTS,
+                        help="mutants executed per size (a stratified sample)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the sample")
+    parser.add_argument("--agent", action="store_true",
+                        help="also time the phases of MutationTestingAgent.run_full_cycle")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.one is not None:
+        # Child mode: one size, metrics as the last line of stdout
+        print(json.dumps(run_size(args.one, args.mode, args.mutants, args.seed, args.agent)))
+        return 0
+
+    results = run_benchmarks(args.sizes, args.mode, args.mutants, args.seed, args.agent)
+    # Timings of different modes or samples are not comparable
+    settings = {"mode": args.mode, "mutants": args.mutants, "seed": args.seed}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings, "sizes": results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    mismatches = settings_mismatch(settings, baseline)
+    if mismatches:
+        print(f"Not comparing against {args.baseline}: {'; '.join(mismatches)}")
+        print("Run with the baseline's settings, or --save-baseline to replace it")
+        return 2
+    regressions = compare(results, baseline["sizes"], args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Incremental cache of mutant outcomes.
+
+A mutant's outcome can only change if the code around it or the tests that
+exercise it change, so each outcome is stored under a key built from:
+
+- the source of the enclosing function (the whole module for top-level code),
+- the mutant's position relative to that function plus operator and
+  replacement, so edits elsewhere in the file that shift lines do not
+  invalidate it,
+- a hash of the tests that cover it (all test files when no coverage map
+  is available).
+
+Later runs only execute mutants whose key is not in the cache.
+
+Alongside the cache, a kill history counts which tests killed mutants at
+each location so that later runs can try the likely killer first.
+"""
+import ast
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from coverage_map import covering_tests
+
+DEFAULT_CACHE_FILE = ".mutation_cache.json"
+DEFAULT_HISTORY_FILE = ".mutation_history.json"
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_files(paths):
+    """Hash the contents of `paths`, in the given order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def find_test_files(root="."):
+    """Return the pytest-style test files under `root`, sorted."""
+    found = set()
+    for pattern in ("test_*.py", "*_test.py"):
+        for path in Path(root).rglob(pattern):
+            if not any(part.startswith(".") for part in path.parts):
+                found.add(str(path))
+    return sorted(found)
+
+
+def function_spans(source):
+    """Return (first_line, last_line, source) for every function in `source`."""
+    tree = ast.parse(source)
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            spans.append((first, node.end_lineno, ast.get_source_segment(source, node)))
+    return spans
+
+
+def enclosing_function(spans, line):
+    """Return the innermost span containing `line`, or None for module level."""
+    best = None
+    for span in spans:
+        if span[0] <= line <= span[1] and (best is None or span[0] >= best[0]):
+            best = span
+    return best
+
+
+class TestHasher:
+    """Hash individual tests by node id, reading each test file once."""
+
+    def __init__(self):
+        self._files = {}
+
+    def _parse(self, path):
+        if path not in self._files:
+            with open(path, "r") as f:
+                source = f.read()
+            tree = ast.parse(source)
+            functions = {}
+            header = []
+            for node in tree.body:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    functions[node.name] = ast.get_source_segment(source, node)
+                else:
+                    # Imports, fixtures' helpers and constants affect every test
+                    header.append(ast.get_source_segment(source, node))
+            self._files[path] = (_hash(*header), functions)
+        return self._files[path]
+
+    def hash_test(self, node_id):
+        """Hash one test from its node id ("file.py::Class::test[param]")."""
+        path, _, rest = node_id.partition("::")
+        name = rest.split("::")[0].split("[")[0]
+        if not os.path.exists(path):
+            return _hash(node_id)
+        header, functions = self._parse(path)
+        return _hash(node_id, header, functions.get(name, ""))
+
+    def hash_tests(self, node_ids):
+        return _hash(*sorted(self.hash_test(node_id) for node_id in node_ids))
+
+
+def mutation_key(mutation, spans, module_hash, tests_hash):
+    """Build the cache key for one mutant."""
+    span = enclosing_function(spans, mutation["line"])
+    if span is None:
+        # Module-level code: no narrower unit than the file itself
+        context, origin = module_hash, 0
+    else:
+        context, origin = _hash(span[2]), span[0]
+    return _hash(
+        mutation["file"], context,
+        mutation["line"] - origin, mutation["col"], mutation["end_line"] - origin, mutation["end_col"],
+        mutation["operator"], mutation["pattern"], mutation["replacement"],
+        tests_hash,
+    )
+
+
+def mutation_keys(source, mutations, line_map=None, test_files=None):
+    """Return the cache key of every mutant of `source`, in order.
+
+    With a `line_map` each key covers only the tests executing the mutant;
+    otherwise it covers every test file.
+    """
+    spans = function_spans(source)
+    module_hash = _hash(source)
+    if line_map is None:
+        all_tests = hash_files(find_test_files() if test_files is None else test_files)
+    hasher = TestHasher()
+
+    keys = []
+    for mutation in mutations:
+        if line_map is None:
+            tests_hash = all_tests
+        else:
+            tests_hash = hasher.hash_tests(covering_tests(line_map, mutation))
+        keys.append(mutation_key(mutation, spans, module_hash, tests_hash))
+    return keys
+
+
+class MutationCache:
+    """Persistent mapping of mutant keys to outcomes, stored as JSON."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt cache is only a cache: start over
+                self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, outcome):
+        self.entries[key] = outcome
+
+    def save(self):
+        """Write the cache atomically so an interrupted run never corrupts it."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def mutation_location(mutation):
+    """Return the key under which kills of `mutation` are counted."""
+    return f"{mutation['file']}:{mutation['line']}"
+
+
+class KillHistory:
+    """Persistent per-location kill counts of tests, stored as JSON."""
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE):
+        self.path = path
+        self.kills = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.kills = json.load(f)
+            except (OSError, ValueError):
+                self.kills = {}
+
+    def record(self, location, test_id):
+        counts = self.kills.setdefault(location, {})
+        counts[test_id] = counts.get(test_id, 0) + 1
+
+    def ranking(self, location):
+        """Return the tests that killed mutants at `location`, most kills first."""
+        counts = self.kills.get(location, {})
+        return sorted(counts, key=lambda test_id: -counts[test_id])
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.kills, f)
+        os.replace(tmp_path, self.path)
+
+
+def order_tests(tests, ranking):
+    """Sort `tests` so that those in `ranking` come first, in ranking order.
+
+    The sort is stable, so tests that never killed anything keep their order.
+    """
+    position = {test_id: index for index, test_id in enumerate(ranking)}
+    return sorted(tests, key=lambda test_id: position.get(test_id, len(position)))
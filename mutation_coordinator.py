@@ -0,0 +1,335 @@
+"""
+Spread one mutation run over several hosts.
+
+A coordinator enumerates the mutants and serves them over plain HTTP with
+JSON bodies; workers pull batches, test them and push the outcomes back:
+
+    GET  /setup      -> {"modules": {file: source}, "options": {...}, "line_map": {...} | null}
+    POST /lease      {"worker": name}
+                     -> {"lease": id, "file": file, "mutations": [...], "lease_timeout": s}
+                      | {"wait": seconds} while all remaining mutants are leased
+                      | {"done": true}
+    POST /heartbeat  {"lease": id} -> {"ok": bool}    (extends the lease)
+    POST /results    {"lease": id, "results": [{"id", "outcome", "killer", "duration"}]} -> {"ok": true}
+    GET  /status     -> {"total", "done", "queued", "leased"}
+
+A lease that is neither renewed nor completed within the lease timeout is
+taken from its worker, presumed dead, and its unfinished mutants go back to
+the front of the queue. Results for a mutant that was already reported are
+ignored, so a slow worker and its replacement never count a mutant twice.
+
+Every worker runs the tests of its own checkout and refuses to start when
+its copy of a module differs from the coordinator's. On one box, start the
+coordinator and any number of workers against localhost:
+
+    python mutation_coordinator.py serve calculator.py --port 8765
+    python mutation_coordinator.py work http://127.0.0.1:8765   # in several shells
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import manual_mutation_testing as engine
+from coverage_map import build_line_map
+from mutation_results import DEFAULT_RESULTS_FILE, ResultsLog, source_hash
+from mutation_targets import expand_targets, paths_to_mutate
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH = 10
+DEFAULT_LEASE_TIMEOUT = 60.0
+
+# How long a worker waits before asking again while every mutant is leased
+POLL_INTERVAL = 0.5
+
+# How long the coordinator keeps answering "done" after the last result
+DONE_GRACE = 2.0
+
+
+class Coordinator:
+    """Queue of mutant batches with leases; safe to use from several threads."""
+
+    def __init__(self, sources, catalogue, chunks, options, line_map=None, lease_timeout=DEFAULT_LEASE_TIMEOUT,
+                 results=None, completed=None):
+        self.sources = sources
+        self.mutations = {m["id"]: m for mutations in catalogue.values() for m in mutations}
+        self.options = options
+        self.line_map = line_map
+        self.lease_timeout = lease_timeout
+        self.results = results
+        self.total = len(self.mutations)
+        self.outcomes = dict(completed or {})
+        self.queue = collections.deque(chunks)
+        self.leases = {}
+        self.lease_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if len(self.outcomes) >= self.total:
+            self.finished.set()
+
+    def setup(self):
+        return {"modules": self.sources, "options": self.options, "line_map": self.line_map}
+
+    def reclaim(self, now):
+        """Requeue the unfinished mutants of every expired lease."""
+        for lease_id, lease in list(self.leases.items()):
+            if lease["deadline"] <= now:
+                del self.leases[lease_id]
+                unfinished = [m for m in lease["mutations"] if m["id"] not in self.outcomes]
+                if unfinished:
+                    print(f"Lease {lease_id} of {lease['worker']} expired; requeueing {len(unfinished)} mutant(s)")
+                    self.queue.appendleft((lease["file"], unfinished))
+
+    def lease(self, worker):
+        with self.lock:
+            if self.finished.is_set():
+                return {"done": True}
+            now = time.monotonic()
+            self.reclaim(now)
+            while self.queue:
+                file, mutations = self.queue.popleft()
+                mutations = [m for m in mutations if m["id"] not in self.outcomes]
+                if not mutations:
+                    continue
+                lease_id = next(self.lease_ids)
+                self.leases[lease_id] = {"worker": worker, "file": file, "mutations": mutations,
+                                         "deadline": now + self.lease_timeout}
+                return {"lease": lease_id, "file": file, "mutations": mutations,
+                        "lease_timeout": self.lease_timeout}
+            return {"wait": POLL_INTERVAL}
+
+    def heartbeat(self, lease_id):
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return {"ok": False}
+            lease["deadline"] = time.monotonic() + self.lease_timeout
+            return {"ok": True}
+
+    def report(self, lease_id, results):
+        with self.lock:
+            # A late report for an expired lease still counts for mutants nobody else finished
+            self.leases.pop(lease_id, None)
+            for result in results:
+                if result["id"] in self.outcomes or result["id"] not in self.mutations:
+                    continue
+                self.outcomes[result["id"]] = result["outcome"]
+                if self.results:
+                    self.results.write(self.mutations[result["id"]], result["outcome"], result.get("duration", 0.0),
+                                       result.get("killer"))
+            print(f"{len(self.outcomes)}/{self.total} mutant(s) done")
+            if len(self.outcomes) >= self.total:
+                self.finished.set()
+            return {"ok": True}
+
+    def status(self):
+        with self.lock:
+            return {"total": self.total, "done": len(self.outcomes),
+                    "queued": sum(len(mutations) for _, mutations in self.queue),
+                    "leased": sum(len(lease["mutations"]) for lease in self.leases.values())}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Translate the HTTP endpoints into Coordinator calls."""
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        coordinator = self.server.coordinator
+        if self.path == "/setup":
+            self._reply(coordinator.setup())
+        elif self.path == "/status":
+            self._reply(coordinator.status())
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        coordinator = self.server.coordinator
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/lease":
+            self._reply(coordinator.lease(request.get("worker", "?")))
+        elif self.path == "/heartbeat":
+            self._reply(coordinator.heartbeat(request["lease"]))
+        elif self.path == "/results":
+            self._reply(coordinator.report(request["lease"], request["results"]))
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def log_message(self, format, *args):
+        # One line per request would drown the progress output
+        pass
+
+
+def serve(targets, host="127.0.0.1", port=DEFAULT_PORT, batch=DEFAULT_BATCH, lease_timeout=DEFAULT_LEASE_TIMEOUT,
+          in_memory=False, warm=False, coverage=False, fail_fast=False, timeout_factor=None, memory_limit=None,
+          cpu_limit=None, deduplicate=True, results_file=None, resume=False):
+    """Coordinate a run over `targets` until every mutant has an outcome.
+
+    Returns {mutation id: outcome}; prints the per-module and per-package
+    summary like analyze_package.
+    """
+    files = expand_targets(targets)
+    sources, catalogue, _, dropped = engine.prepare_modules(files, deduplicate)
+    mutations = [mutation for path in files for mutation in catalogue[path]]
+    print(f"Found {len(mutations)} mutant(s) in {len(files)} module(s); dropped {dropped} equivalent or duplicate")
+
+    line_map = build_line_map(files) if coverage and files else None
+    results = ResultsLog(results_file, sources, resume=resume) if results_file else None
+    completed = {}
+    if results:
+        completed = {m["id"]: results.completed[m["id"]]["outcome"] for m in mutations if m["id"] in results.completed}
+    pending = [m for m in mutations if m["id"] not in completed]
+    options = {"in_memory": in_memory, "warm": warm, "fail_fast": fail_fast, "timeout_factor": timeout_factor,
+               "limits": {"memory_mb": memory_limit, "cpu_seconds": cpu_limit} if memory_limit or cpu_limit else None}
+    coordinator = Coordinator(sources, catalogue, engine.schedule_mutants(pending, line_map, batch), options,
+                              line_map, lease_timeout, results, completed)
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.coordinator = coordinator
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Coordinating {len(pending)} mutant(s) on http://{host}:{server.server_address[1]} "
+          f"(batches of {batch}, lease timeout {lease_timeout:.0f}s)")
+    try:
+        while not coordinator.finished.wait(1.0):
+            with coordinator.lock:
+                # Reclaim expired leases even while no worker is asking for work
+                coordinator.reclaim(time.monotonic())
+        # Let polling workers hear that the run is over
+        time.sleep(DONE_GRACE)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if results:
+            results.close()
+
+    engine.print_package_summary(catalogue, coordinator.outcomes)
+    return coordinator.outcomes
+
+
+def _call(url, path, payload=None):
+    """GET (or POST `payload` as JSON) and return the decoded JSON reply."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url.rstrip("/") + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _keep_alive(url, lease_id, interval, stop):
+    """Renew a lease every `interval` seconds until `stop` is set."""
+    while not stop.wait(interval):
+        try:
+            _call(url, "/heartbeat", {"lease": lease_id})
+        except OSError:
+            return
+
+
+def work(url, name=None):
+    """Pull batches from the coordinator at `url` until it reports done.
+
+    Returns the number of mutants this worker tested.
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    setup = _call(url, "/setup")
+    for path, source in setup["modules"].items():
+        with open(path, "r") as f:
+            if source_hash(f.read()) != source_hash(source):
+                raise RuntimeError(f"{path} differs from the coordinator's copy; check out the same revision")
+
+    options = setup["options"]
+    line_map = setup["line_map"]
+    if line_map is not None:
+        # JSON turned the line numbers into strings
+        line_map = {target: {int(line): tests for line, tests in lines.items()} for target, lines in line_map.items()}
+    modules = {path: (source, None) for path, source in setup["modules"].items()}
+    # Several workers may share a host, so on-disk mutants get a private sandbox
+    engine.init_package_worker(modules, options["in_memory"], True, line_map, options["warm"], options["fail_fast"])
+    timeout = engine.calibrate_package_timeout(options["timeout_factor"]) if options["timeout_factor"] else None
+
+    tested = 0
+    try:
+        while True:
+            reply = _call(url, "/lease", {"worker": name})
+            if reply.get("done"):
+                break
+            if "wait" in reply:
+                time.sleep(reply["wait"])
+                continue
+
+            stop = threading.Event()
+            keeper = threading.Thread(target=_keep_alive, daemon=True,
+                                      args=(url, reply["lease"], reply["lease_timeout"] / 3, stop))
+            keeper.start()
+            try:
+                outcomes = engine.check_mutations(reply["file"], reply["mutations"], timeout, options["limits"])
+            finally:
+                stop.set()
+                keeper.join()
+            results = [{"id": mutation["id"], "outcome": outcome, "killer": killer, "duration": seconds}
+                       for mutation, (outcome, killer, seconds) in zip(reply["mutations"], outcomes)]
+            _call(url, "/results", {"lease": reply["lease"], "results": results})
+            tested += len(results)
+            print(f"{name}: tested {len(results)} mutant(s) of {reply['file']}")
+    except urllib.error.URLError as e:
+        # The coordinator is gone: it finished, or it will requeue our lease
+        print(f"{name}: lost the coordinator ({e.reason})")
+    finally:
+        engine._close_warm_servers()
+    return tested
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed mutation testing over HTTP")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="enumerate mutants and hand them out to workers")
+    serve_parser.add_argument("targets", nargs="*", help="files, directories or globs (default: setup.cfg paths)")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="mutants per lease")
+    serve_parser.add_argument("--lease-timeout", type=float, default=DEFAULT_LEASE_TIMEOUT,
+                              help="seconds without a heartbeat before a lease is requeued")
+    serve_parser.add_argument("--in-memory", action="store_true")
+    serve_parser.add_argument("--warm", action="store_true")
+    serve_parser.add_argument("--coverage", action="store_true")
+    serve_parser.add_argument("--fail-fast", action="store_true")
+    serve_parser.add_argument("--timeout-factor", type=float, default=5.0)
+    serve_parser.add_argument("--memory-limit", type=int)
+    serve_parser.add_argument("--cpu-limit", type=int)
+    serve_parser.add_argument("--results", default=DEFAULT_RESULTS_FILE)
+    serve_parser.add_argument("--resume", action="store_true")
+
+    work_parser = commands.add_parser("work", help="pull and test mutants from a coordinator")
+    work_parser.add_argument("url", help="coordinator address, e.g. http://127.0.0.1:8765")
+    work_parser.add_argument("--name", help="worker name shown by the coordinator")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.targets or paths_to_mutate(), args.host, args.port, args.batch, args.lease_timeout,
+              in_memory=args.in_memory, warm=args.warm, coverage=args.coverage, fail_fast=args.fail_fast,
+              timeout_factor=args.timeout_factor, memory_limit=args.memory_limit, cpu_limit=args.cpu_limit,
+              results_file=args.results, resume=args.resume)
+    else:
+        work(args.url, args.name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
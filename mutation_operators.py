@@ -0,0 +1,263 @@
+"""
+AST-based mutation operators.
+
+Each module is read and parsed once; walking the tree yields a catalogue of
+mutants that record exactly which token or node they replace, so operators
+never fire inside strings or docstrings and `>` is never confused with `>=`.
+Every occurrence on a line becomes its own mutant.
+
+Before execution, mutants can be compiled and compared by bytecode: one
+that compiles to the same code as the original is trivially equivalent,
+and one that compiles to the same code as an earlier mutant is a
+duplicate. Neither can tell the tests anything new.
+"""
+import ast
+import bisect
+import hashlib
+import io
+import tokenize
+import types
+
+# Operator token replacements, grouped the same way as the old regex table
+ARITHMETIC = {
+    ast.Add: ("+", "-"),
+    ast.Sub: ("-", "+"),
+    ast.Pow: ("**", "*"),
+    ast.Mult: ("*", "/"),
+    ast.Div: ("/", "*"),
+    ast.Mod: ("%", "/"),
+}
+
+COMPARISON = {
+    ast.Eq: ("==", "!="),
+    ast.NotEq: ("!=", "=="),
+    ast.Gt: (">", "<="),
+    ast.Lt: ("<", ">="),
+    ast.GtE: (">=", "<"),
+    ast.LtE: ("<=", ">"),
+}
+
+BOOLEAN = {
+    ast.And: ("and", "or"),
+    ast.Or: ("or", "and"),
+}
+
+# Literal replacements keyed by (type, value) so that True is not taken for 1
+VALUES = {
+    (int, 0): "1",
+    (int, 1): "0",
+    (bool, True): "False",
+    (bool, False): "True",
+    (type(None), None): "True",
+}
+
+
+def source_lines(source):
+    """Split `source` into lines, keeping their ends, as Python numbers them."""
+    # str.splitlines also breaks at form feeds, \x1c-\x1e, \x85 and \u2028
+    return io.StringIO(source).readlines()
+
+
+class _Locator:
+    """Map AST positions to character offsets and find operator tokens."""
+
+    def __init__(self, source):
+        self.lines = source_lines(source)
+        self.tokens = [
+            tok for tok in tokenize.generate_tokens(io.StringIO(source).readline)
+            if tok.type in (tokenize.OP, tokenize.NAME)
+        ]
+        self.starts = [tok.start for tok in self.tokens]
+
+    def position(self, lineno, byte_col):
+        """Convert an AST (line, UTF-8 byte column) pair to (line, char column)."""
+        line = self.lines[lineno - 1].encode("utf-8")
+        return lineno, len(line[:byte_col].decode("utf-8"))
+
+    def start(self, node):
+        return self.position(node.lineno, node.col_offset)
+
+    def end(self, node):
+        return self.position(node.end_lineno, node.end_col_offset)
+
+    def token_between(self, text, start, end):
+        """Return the first token spelled `text` that lies within [start, end)."""
+        index = bisect.bisect_left(self.starts, start)
+        while index < len(self.tokens) and self.tokens[index].start < end:
+            tok = self.tokens[index]
+            if tok.string == text:
+                return tok.start, tok.end
+            index += 1
+        return None
+
+    def next_token_start(self, position):
+        """Return where the first token after `position` begins."""
+        index = bisect.bisect_right(self.starts, position)
+        return self.tokens[index].start
+
+
+def _make_mutation(locator, file_name, operator, start, end, replacement):
+    """Build the catalogue entry for replacing the span [start, end)."""
+    (line, col), (end_line, end_col) = start, end
+    lines = locator.lines
+    original_text = "".join(lines[line - 1:end_line])
+    head, tail = lines[line - 1][:col], lines[end_line - 1][end_col:]
+    pattern = _segment(lines, start, end)
+    return {
+        "id": f"{file_name}:{line}:{col}:{operator}",
+        "file": file_name,
+        "line": line,
+        "col": col,
+        "end_line": end_line,
+        "end_col": end_col,
+        "operator": operator,
+        "pattern": pattern,
+        "replacement": replacement,
+        "original": original_text.strip(),
+        "mutated": (head + replacement + tail).strip(),
+    }
+
+
+def _segment(lines, start, end):
+    """Return the source text of the span [start, end)."""
+    (line, col), (end_line, end_col) = start, end
+    if line == end_line:
+        return lines[line - 1][col:end_col]
+    parts = [lines[line - 1][col:]] + lines[line:end_line - 1] + [lines[end_line - 1][:end_col]]
+    return "".join(parts)
+
+
+def _operator_mutations(locator, node):
+    """Yield the (operator, start, end, replacement) spans for one node."""
+    if isinstance(node, ast.BinOp) and type(node.op) in ARITHMETIC:
+        text, replacement = ARITHMETIC[type(node.op)]
+        span = locator.token_between(text, locator.end(node.left), locator.start(node.right))
+        if span:
+            yield "arithmetic", span[0], span[1], replacement
+
+    elif isinstance(node, ast.AugAssign) and type(node.op) in ARITHMETIC:
+        text, replacement = ARITHMETIC[type(node.op)]
+        span = locator.token_between(text + "=", locator.end(node.target), locator.start(node.value))
+        if span:
+            yield "arithmetic", span[0], span[1], replacement + "="
+
+    elif isinstance(node, ast.Compare):
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if type(op) in COMPARISON:
+                text, replacement = COMPARISON[type(op)]
+                span = locator.token_between(text, locator.end(left), locator.start(right))
+                if span:
+                    yield "comparison", span[0], span[1], replacement
+            left = right
+
+    elif isinstance(node, ast.BoolOp):
+        text, replacement = BOOLEAN[type(node.op)]
+        for left, right in zip(node.values, node.values[1:]):
+            span = locator.token_between(text, locator.end(left), locator.start(right))
+            if span:
+                yield "boolean", span[0], span[1], replacement
+
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        # Drop the `not` keyword together with the whitespace that follows it
+        start = locator.start(node)
+        yield "boolean", start, locator.next_token_start(start), ""
+
+    elif isinstance(node, ast.Return) and node.value is not None:
+        value = node.value
+        if isinstance(value, ast.Constant) and isinstance(value.value, bool):
+            replacement = str(not value.value)
+        else:
+            replacement = "True"
+        yield "return", locator.start(value), locator.end(value), replacement
+
+    elif isinstance(node, ast.Raise):
+        yield "exception", locator.start(node), locator.end(node), "pass"
+
+    elif isinstance(node, ast.Constant):
+        replacement = VALUES.get((type(node.value), node.value))
+        if replacement is not None:
+            yield "value", locator.start(node), locator.end(node), replacement
+
+
+def iter_mutations(file_name, source=None):
+    """Yield every mutant of `file_name` in source order.
+
+    The file is read once (unless `source` is given) and parsed once.
+    """
+    if source is None:
+        with open(file_name, "r") as f:
+            source = f.read()
+
+    tree = ast.parse(source, filename=file_name)
+    locator = _Locator(source)
+
+    spans = []
+    for node in ast.walk(tree):
+        for operator, start, end, replacement in _operator_mutations(locator, node):
+            spans.append((start, end, operator, replacement))
+
+    # ast.walk is breadth-first; report mutants in reading order instead
+    spans.sort(key=lambda span: (span[0], span[1]))
+    for start, end, operator, replacement in spans:
+        yield _make_mutation(locator, file_name, operator, start, end, replacement)
+
+
+def find_mutations(file_name, source=None):
+    """Return the full mutant catalogue for `file_name` as a list."""
+    return list(iter_mutations(file_name, source))
+
+
+def mutate_source(source, mutation):
+    """Return `source` with `mutation` applied."""
+    lines = source_lines(source)
+    line, col = mutation["line"], mutation["col"]
+    end_line, end_col = mutation["end_line"], mutation["end_col"]
+    head, tail = lines[line - 1][:col], lines[end_line - 1][end_col:]
+    return "".join(lines[:line - 1] + [head + mutation["replacement"] + tail] + lines[end_line:])
+
+
+def _code_signature(code):
+    """Describe a code object without its file name or line/column table."""
+    consts = tuple(
+        _code_signature(const) if isinstance(const, types.CodeType) else (type(const).__name__, repr(const))
+        for const in code.co_consts
+    )
+    return (
+        code.co_name, code.co_argcount, code.co_posonlyargcount, code.co_kwonlyargcount,
+        code.co_flags, code.co_code, consts, code.co_names, code.co_varnames,
+        code.co_freevars, code.co_cellvars,
+    )
+
+
+def bytecode_hash(source, file_name="<mutant>"):
+    """Hash the compiled form of `source`, ignoring positions; None if it does not compile."""
+    try:
+        code = compile(source, file_name, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return None
+    return hashlib.sha256(repr(_code_signature(code)).encode("utf-8")).hexdigest()
+
+
+def filter_equivalent(source, mutations, file_name="<mutant>"):
+    """Split `mutations` by trivial compiler equivalence.
+
+    Returns (kept, equivalent, duplicates): `equivalent` compile to the same
+    bytecode as the original, `duplicates` to the same bytecode as a mutant
+    kept earlier. Mutants that do not compile are kept, so the tests decide.
+    """
+    original = bytecode_hash(source, file_name)
+    seen = set()
+    kept, equivalent, duplicates = [], [], []
+    for mutation in mutations:
+        digest = bytecode_hash(mutate_source(source, mutation), file_name)
+        if digest is None:
+            kept.append(mutation)
+        elif digest == original:
+            equivalent.append(mutation)
+        elif digest in seen:
+            duplicates.append(mutation)
+        else:
+            seen.add(digest)
+            kept.append(mutation)
+    return kept, equivalent, duplicates
@@ -0,0 +1,201 @@
+"""
+Lightweight spans for finding where a mutation run spends its time.
+
+Wrap a phase in a span:
+
+    with span("run", mutant=mutation["id"]):
+        ...
+
+or a whole function with the @traced decorator. While profiling is off
+(the default) span() only checks a flag and returns a shared no-op
+context manager, so the hooks can stay in the hot paths.
+
+When enabled, every span is recorded with its process and thread, and
+write_trace() dumps them in the Chrome trace event format, which
+chrome://tracing and https://ui.perfetto.dev open directly. summary()
+aggregates them per span name, with percentiles to expose tail latency.
+
+Worker processes of a pool record spans too: enabling profiling exports a
+spool directory through the environment, and each worker writes its spans
+there when it shuts down, for write_trace() to merge.
+"""
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Set for the processes of a profiled run; names the directory workers spool to
+SPOOL_VARIABLE = "MUTATION_PROFILE_SPOOL"
+
+# Trace file for the mutation agent when it runs as a script
+TRACE_VARIABLE = "MUTATION_TRACE"
+
+_enabled = False
+_events = []
+_spool = None
+_owner = None
+
+
+class _NullSpan:
+    """The span handed out while profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A recorded span; `set` attaches arguments known only at the end."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        _events.append((self.name, self.start, end - self.start, os.getpid(), threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+def span(name, **args):
+    """Return a context manager timing `name`; free when profiling is off."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name):
+    """Decorate a function so that every call is recorded as span `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable():
+    """Start recording spans in this process and in pool workers started later."""
+    global _enabled, _spool, _owner
+    _enabled = True
+    if _spool is None:
+        _spool = tempfile.mkdtemp(prefix="mutation-profile-")
+        _owner = os.getpid()
+        os.environ[SPOOL_VARIABLE] = _spool
+
+
+def disable():
+    """Stop recording and forget everything recorded so far."""
+    global _enabled, _spool, _owner
+    _enabled = False
+    _events.clear()
+    if _spool is not None:
+        os.environ.pop(SPOOL_VARIABLE, None)
+        shutil.rmtree(_spool, ignore_errors=True)
+        _spool = _owner = None
+
+
+def enabled():
+    return _enabled
+
+
+def _spool_events(directory):
+    with open(os.path.join(directory, f"{os.getpid()}.json"), "w") as f:
+        json.dump(_events, f)
+
+
+def start_worker():
+    """Called from pool initializers: record spans if the parent is profiling.
+
+    The worker's spans are spooled when the pool shuts it down.
+    """
+    global _enabled
+    spool = os.environ.get(SPOOL_VARIABLE)
+    if not spool or _owner == os.getpid():
+        return
+    import multiprocessing.util
+    # A forked worker inherits the parent's spans; they are the parent's to report
+    _events.clear()
+    _enabled = True
+    # Runs when the pool shuts the worker down (atexit is skipped there)
+    multiprocessing.util.Finalize(None, _spool_events, args=(spool,), exitpriority=5)
+
+
+def events():
+    """Return the spans of this process and of the workers that have finished."""
+    collected = list(_events)
+    if _spool and os.path.isdir(_spool):
+        for name in sorted(os.listdir(_spool)):
+            with open(os.path.join(_spool, name), "r") as f:
+                collected.extend(tuple(event) for event in json.load(f))
+    return collected
+
+
+def write_trace(path):
+    """Write the recorded spans as a Chrome/Perfetto trace JSON file."""
+    recorded = events()
+    origin = min((event[1] for event in recorded), default=0)
+    trace = [
+        {"name": name, "cat": name.split(".")[0], "ph": "X", "ts": (start - origin) / 1000, "dur": duration / 1000,
+         "pid": pid, "tid": tid, "args": args}
+        for name, start, duration, pid, tid, args in recorded
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+def _percentile(durations, fraction):
+    return durations[min(len(durations) - 1, int(fraction * len(durations)))]
+
+
+def summary():
+    """Return {name: {count, total, mean, p50, p95, max}} in seconds, slowest total first."""
+    durations = {}
+    for name, _, duration, _, _, _ in events():
+        durations.setdefault(name, []).append(duration / 1e9)
+    table = {}
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        table[name] = {
+            "count": len(values),
+            "total": sum(values),
+            "mean": sum(values) / len(values),
+            "p50": _percentile(values, 0.5),
+            "p95": _percentile(values, 0.95),
+            "max": values[-1],
+        }
+    return table
+
+
+def print_summary():
+    """Print the per-span summary table."""
+    table = summary()
+    if not table:
+        return
+    width = max(len(name) for name in table)
+    print("\n" + "="*50)
+    print(f"{'span':<{width}} {'count':>7} {'total s':>9} {'mean s':>9} {'p50 s':>9} {'p95 s':>9} {'max s':>9}")
+    for name, row in table.items():
+        print(f"{name:<{width}} {row['count']:>7} {row['total']:>9.3f} {row['mean']:>9.4f} "
+              f"{row['p50']:>9.4f} {row['p95']:>9.4f} {row['max']:>9.4f}")
@@ -0,0 +1,84 @@
+"""
+Streaming, resumable log of mutant outcomes.
+
+Every mutant's result is appended to a JSON-lines file as soon as it is
+known and flushed to disk, so a run that is interrupted keeps everything
+it finished. One record per line:
+
+    {"id": "calculator.py:5:13:arithmetic", "file": "calculator.py",
+     "line": 5, "col": 13, "operator": "arithmetic", "outcome": "killed",
+     "duration": 0.41, "killer": "test_calculator.py::test_add",
+     "cached": false, "source": "<sha256 of the mutated file>"}
+
+A resumed run reads the log back and skips the mutants already in it.
+Records are only reused while their file is unchanged, since mutant ids
+are positions in that file.
+"""
+import hashlib
+import json
+import os
+
+DEFAULT_RESULTS_FILE = "mutation_results.jsonl"
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def load_results(path, sources=None):
+    """Return {mutant id: record} from the log at `path`.
+
+    With `sources` ({file: source}) only records made against the current
+    source of their file are returned. A line cut short by an interrupted
+    write is ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    digests = {file: source_hash(source) for file, source in (sources or {}).items()}
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if sources is None or digests.get(record.get("file")) == record.get("source"):
+                records[record["id"]] = record
+    return records
+
+
+class ResultsLog:
+    """Append-only JSON-lines log of the mutant outcomes of the files in `sources`."""
+
+    def __init__(self, path, sources, resume=False):
+        self.path = path
+        self.digests = {file: source_hash(source) for file, source in sources.items()}
+        self.completed = load_results(path, sources) if resume else {}
+        self.file = open(path, "a" if resume else "w")
+        if resume and self.file.tell():
+            # Terminate a last line that an interrupted run left unfinished
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read() != b"\n":
+                    self.file.write("\n")
+
+    def write(self, mutation, outcome, duration=0.0, killer=None, cached=False):
+        """Append the record of one mutant and force it to disk."""
+        record = {
+            "id": mutation["id"],
+            "file": mutation["file"],
+            "line": mutation["line"],
+            "col": mutation["col"],
+            "operator": mutation["operator"],
+            "outcome": outcome,
+            "duration": round(duration, 6),
+            "killer": killer,
+            "cached": cached,
+            "source": self.digests[mutation["file"]],
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,113 @@
+"""
+Stratified random sampling of mutants.
+
+Testing a random sample instead of every mutant gives an estimate of the
+mutation score in a fraction of the time. Mutants are grouped into strata
+by file, operator and enclosing function, and each stratum is sampled in
+proportion to its size, so no module, operator or function is left out by
+chance.
+
+The score is estimated stratum by stratum and reported with an
+Agresti-Coull style confidence interval that includes the finite
+population correction: sampling every mutant of a stratum leaves no uncertainty.
+The seed is fixed by default so the same code yields the same sample.
+"""
+import math
+import random
+
+from mutation_cache import enclosing_function, function_spans
+
+DEFAULT_SEED = 0
+
+# Two-sided z-score for a 95% confidence interval
+Z_95 = 1.96
+
+
+def sample_size(spec, population):
+    """Turn a --sample value ("10%" or "500") into a mutant count."""
+    spec = str(spec).strip()
+    if spec.endswith("%"):
+        size = math.ceil(population * float(spec[:-1]) / 100)
+    else:
+        size = int(spec)
+    if size <= 0:
+        raise ValueError(f"Sample size must be positive: {spec}")
+    return min(size, population)
+
+
+def stratum(mutation, spans):
+    """Return the (file, operator, function) stratum of `mutation`; `spans` maps files to their function spans."""
+    span = enclosing_function(spans[mutation["file"]], mutation["line"])
+    return mutation["file"], mutation["operator"], span[0] if span else 0
+
+
+def _allocate(counts, size):
+    """Split `size` over strata in proportion to `counts`, by largest remainder.
+
+    Every stratum gets at least one mutant; `size` must not be smaller than
+    the number of strata.
+    """
+    rest = sum(counts.values()) - len(counts)
+    spare = size - len(counts)
+    shares = {key: 1 + (spare * (count - 1) / rest if rest else 0) for key, count in counts.items()}
+    allocation = {key: int(share) for key, share in shares.items()}
+    leftover = size - sum(allocation.values())
+    for key in sorted(shares, key=lambda key: allocation[key] - shares[key])[:leftover]:
+        allocation[key] += 1
+    return allocation
+
+
+def stratified_sample(source, mutations, size, seed=DEFAULT_SEED):
+    """Draw `size` of `mutations`, stratified by file, operator and function.
+
+    `source` is the source of the mutated module, or {file: source} when
+    `mutations` span several modules. Returns (sample, strata): the sample
+    in catalogue order and, for each stratum, its size and the ids of its
+    mutants. When the sample is smaller than the number of strata,
+    functions are dropped from the stratification, then operators, then
+    files, so that every stratum still gets at least one mutant.
+    """
+    sources = source if isinstance(source, dict) else {mutation["file"]: source for mutation in mutations}
+    spans = {file: function_spans(text) for file, text in sources.items()}
+    rng = random.Random(seed)
+    for keep in (3, 2, 1, 0):
+        groups = {}
+        for mutation in mutations:
+            groups.setdefault(stratum(mutation, spans)[:keep], []).append(mutation)
+        if len(groups) <= size:
+            break
+
+    counts = {key: len(group) for key, group in groups.items()}
+    allocation = _allocate(counts, size)
+    chosen = set()
+    for key, group in groups.items():
+        chosen.update(mutation["id"] for mutation in rng.sample(group, allocation[key]))
+    sample = [mutation for mutation in mutations if mutation["id"] in chosen]
+    strata = {key: {"population": count, "ids": {m["id"] for m in groups[key]}} for key, count in counts.items()}
+    return sample, strata
+
+
+def estimate_score(strata, sample, surviving, z=Z_95):
+    """Estimate the population mutation score from the sampled outcomes.
+
+    Returns (score, low, high) as fractions.
+    """
+    surviving_ids = {mutation["id"] for mutation in surviving}
+    population = sum(group["population"] for group in strata.values())
+    score = variance = 0.0
+    for group in strata.values():
+        tested = [mutation for mutation in sample if mutation["id"] in group["ids"]]
+        n, size = len(tested), group["population"]
+        if not n:
+            continue
+        killed = sum(mutation["id"] not in surviving_ids for mutation in tested)
+        weight = size / population
+        p = killed / n
+        # Agresti-Coull adjusted proportion, so that a stratum where every
+        # sampled mutant was killed (or survived) still carries uncertainty
+        adjusted = (killed + 2) / (n + 4)
+        spread = adjusted * (1 - adjusted)
+        score += weight * p
+        variance += weight ** 2 * (1 - n / size) * spread / n
+    margin = z * math.sqrt(variance)
+    return score, max(0.0, score - margin), min(1.0, score + margin)
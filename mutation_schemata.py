@@ -0,0 +1,157 @@
+"""
+Mutant schemata: every mutant of a module compiled into one meta-module.
+
+Instead of one source variant per mutant, the schema module contains the
+original code plus, for each mutant, a mutated copy of the function it
+lives in. Each mutated function starts with a guard that hands the call to
+the variant selected by the module global ``__mutant_id__``:
+
+    def add(a, b):
+        if __mutant_id__ in {1, 2}:
+            return __mutants__[__mutant_id__](a, b)
+        return a + b
+
+    def __mutant_2_add(a, b):
+        return a - b
+
+The module is compiled and imported once; switching mutants is setting
+``__mutant_id__`` (initially read from the MUTANT_ID environment variable,
+0 meaning the original code). Tests keep their references to the original
+function objects, so the switch reaches them too.
+
+Only mutants inside the body of a top-level function can be dispatched
+this way. Mutants in module-level code, class bodies, default values or
+decorators run at import time and are returned as unsupported so that the
+caller can test them the ordinary way.
+"""
+import ast
+
+from mutation_operators import mutate_source, source_lines
+
+MUTANT_ID_VARIABLE = "MUTANT_ID"
+
+
+def _char_col(lines, lineno, byte_col):
+    return len(lines[lineno - 1].encode("utf-8")[:byte_col].decode("utf-8"))
+
+
+def _body_owner(tree, lines, mutation):
+    """Return the index of the top-level function whose body holds `mutation`."""
+    for index, node in enumerate(tree.body):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        first = node.body[0]
+        body_start = (first.lineno, _char_col(lines, first.lineno, first.col_offset))
+        if body_start <= (mutation["line"], mutation["col"]) and mutation["end_line"] <= node.end_lineno:
+            return index
+    return None
+
+
+def _is_prologue(node, index):
+    """True for statements that must stay at the very top of a module."""
+    if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+        return True
+    return (index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str))
+
+
+def _is_generator(node):
+    """True if `node`'s own body yields (nested functions do not count)."""
+    stack = list(node.body)
+    while stack:
+        child = stack.pop()
+        if isinstance(child, (ast.Yield, ast.YieldFrom)):
+            return True
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            stack.extend(ast.iter_child_nodes(child))
+    return False
+
+
+def _forward_call(node):
+    """Build `__mutants__[__mutant_id__](<the function's own arguments>)`."""
+    arguments = node.args
+    args = [ast.Name(arg.arg, ast.Load()) for arg in arguments.posonlyargs + arguments.args]
+    if arguments.vararg:
+        args.append(ast.Starred(ast.Name(arguments.vararg.arg, ast.Load()), ast.Load()))
+    keywords = [ast.keyword(arg.arg, ast.Name(arg.arg, ast.Load())) for arg in arguments.kwonlyargs]
+    if arguments.kwarg:
+        keywords.append(ast.keyword(None, ast.Name(arguments.kwarg.arg, ast.Load())))
+    target = ast.Subscript(ast.Name("__mutants__", ast.Load()), ast.Name("__mutant_id__", ast.Load()), ast.Load())
+    return ast.Call(target, args, keywords)
+
+
+def _guard(node, mutant_ids):
+    """Build the dispatch statement placed at the top of a mutated function."""
+    call = _forward_call(node)
+    if isinstance(node, ast.AsyncFunctionDef):
+        body = [ast.Return(ast.Await(call))]
+    elif _is_generator(node):
+        body = [ast.Expr(ast.YieldFrom(call)), ast.Return(None)]
+    else:
+        body = [ast.Return(call)]
+    condition = ast.Compare(
+        ast.Name("__mutant_id__", ast.Load()), [ast.In()],
+        [ast.Set([ast.Constant(mutant_id) for mutant_id in mutant_ids])]
+    )
+    return ast.If(condition, body, [])
+
+
+def build_schema(source, mutations):
+    """Compile all supported `mutations` of `source` into one schema module.
+
+    Returns (schema_source, schema_ids, unsupported) where `schema_ids` maps
+    each supported mutation id to the integer that activates it.
+    """
+    tree = ast.parse(source)
+    lines = source_lines(source)
+
+    schema_ids = {}
+    unsupported = []
+    variants = {}
+    for mutation in mutations:
+        index = _body_owner(tree, lines, mutation)
+        owner = tree.body[index] if index is not None else None
+        if owner is None or (isinstance(owner, ast.AsyncFunctionDef) and _is_generator(owner)):
+            unsupported.append(mutation)
+            continue
+
+        mutant_id = len(schema_ids) + 1
+        # Mutations never add or remove top-level statements, so the mutated
+        # function sits at the same index in the mutated module
+        variant = ast.parse(mutate_source(source, mutation)).body[index]
+        variant.name = f"__mutant_{mutant_id}_{owner.name}"
+        variant.decorator_list = []
+        schema_ids[mutation["id"]] = mutant_id
+        variants.setdefault(index, []).append((mutant_id, variant))
+
+    header = ast.parse(
+        "import os as __mutation_os\n"
+        f"__mutant_id__ = int(__mutation_os.environ.get({MUTANT_ID_VARIABLE!r}, '0'))\n"
+        "__mutants__ = {}\n"
+    ).body
+    body = []
+    for index, node in enumerate(tree.body):
+        if header and not _is_prologue(node, index):
+            # The selector goes after the docstring and __future__ imports
+            body.extend(header)
+            header = None
+        if index not in variants:
+            body.append(node)
+            continue
+        mutant_ids = [mutant_id for mutant_id, _ in variants[index]]
+        # Keep the docstring first so the function still reports it
+        has_docstring = (node.body and isinstance(node.body[0], ast.Expr)
+                         and isinstance(node.body[0].value, ast.Constant)
+                         and isinstance(node.body[0].value.value, str))
+        position = 1 if has_docstring else 0
+        node.body.insert(position, _guard(node, mutant_ids))
+        body.append(node)
+        for mutant_id, variant in variants[index]:
+            body.append(variant)
+            body.append(ast.parse(f"__mutants__[{mutant_id}] = {variant.name}").body[0])
+
+    if header:
+        body.extend(header)
+    module = ast.Module(body=body, type_ignores=[])
+    ast.fix_missing_locations(module)
+    return ast.unparse(module) + "\n", schema_ids, unsupported
@@ -0,0 +1,59 @@
+"""
+Find the modules to mutate and name them the way Python imports them.
+
+Targets can be files, directories (searched recursively) or glob patterns
+such as ``src/**/*.py``. Test files, hidden directories and __pycache__ are
+never mutated. By default the targets come from mutmut's
+``paths_to_mutate`` setting in setup.cfg, so both tools agree on what is
+under test.
+"""
+import configparser
+import glob
+import os
+from pathlib import Path
+
+from mutation_cache import find_test_files
+
+
+def paths_to_mutate(config_file="setup.cfg"):
+    """Return the paths mutmut is configured to mutate."""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    paths = config.get("mutmut", "paths_to_mutate", fallback="calculator.py")
+    return [path.strip() for path in paths.split(",") if path.strip()]
+
+
+def _is_candidate(path):
+    path = Path(path)
+    if path.suffix != ".py" or path.name == "conftest.py":
+        return False
+    return not any(part == "__pycache__" or (part.startswith(".") and part != "..") for part in path.parts)
+
+
+def expand_targets(patterns):
+    """Return the sorted, unique Python files named by `patterns`."""
+    found = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                found.update(str(path) for path in Path(match).rglob("*.py"))
+            elif os.path.exists(match):
+                found.add(os.path.normpath(match))
+    tests = {os.path.normpath(path) for path in find_test_files()}
+    return sorted(path for path in (os.path.normpath(path) for path in found)
+                  if _is_candidate(path) and path not in tests)
+
+
+def module_name(path):
+    """Return the dotted import name of the module at `path` (relative to the cwd)."""
+    parts = list(Path(os.path.relpath(path)).with_suffix("").parts)
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def package_name(path):
+    """Return the dotted name of the package containing `path`, "" at top level."""
+    parts = list(Path(os.path.relpath(path)).parent.parts)
+    return ".".join(part for part in parts if part != ".")
@@ -0,0 +1,100 @@
+"""
+Bulk access to mutmut's result cache.
+
+`mutmut run` records every mutant in the SQLite database `.mutmut-cache`
+(tables SourceFile, Line and Mutant). Reading it directly gives the status
+of all mutants in one query, instead of parsing `mutmut results` and
+starting `mutmut show` once per survivor:
+
+    {"id": 7, "file": "calculator.py", "line": 12, "index": 0,
+     "source_line": "    return a + b", "status": "bad_survived"}
+
+Diffs come from mutmut's own library in this process; without mutmut
+there is no diff, and so no mutated source, for a mutant.
+"""
+import os
+import sqlite3
+
+CACHE_FILE = ".mutmut-cache"
+
+SURVIVED = "bad_survived"
+TIMEOUT = "bad_timeout"
+KILLED = "ok_killed"
+SUSPICIOUS = "ok_suspicious"
+SKIPPED = "skipped"
+UNTESTED = "untested"
+
+# Mutants the tests caught: mutmut's "ok_*" statuses, and timeouts, which
+# the manual engine also counts as killed
+KILLED_STATUSES = (KILLED, SUSPICIOUS, TIMEOUT)
+
+_QUERY = """
+    SELECT Mutant.id, SourceFile.filename, Line.line_number, Mutant."index", Line.line, Mutant.status
+    FROM Mutant
+    JOIN Line ON Mutant.line = Line.id
+    JOIN SourceFile ON Line.sourcefile = SourceFile.id
+    ORDER BY SourceFile.filename, Line.line_number, Mutant."index"
+"""
+
+
+def load_mutants(path=CACHE_FILE):
+    """Return every mutant in the cache at `path`, in file and line order."""
+    if not os.path.exists(path):
+        return []
+    # Read-only, so a cache mutmut is still writing is never modified
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(_QUERY).fetchall()
+    finally:
+        connection.close()
+    return [
+        # mutmut numbers lines from 0
+        {"id": mutant_id, "file": filename, "line": line_number + 1, "index": index,
+         "source_line": source_line, "status": status}
+        for mutant_id, filename, line_number, index, source_line, status in rows
+    ]
+
+
+def count_statuses(mutants):
+    """Return {status: number of mutants}."""
+    counts = {}
+    for mutant in mutants:
+        counts[mutant["status"]] = counts.get(mutant["status"], 0) + 1
+    return counts
+
+
+def mutant_diffs(mutants):
+    """Return {mutant id: unified diff} for `mutants`, computed in this process.
+
+    The diffs come from mutmut's own get_unified_diff; every diff is None
+    when mutmut cannot be imported, since the cache does not record what a
+    mutant changed.
+    """
+    try:
+        from mutmut.cache import get_unified_diff
+    except ImportError:
+        return {mutant["id"]: None for mutant in mutants}
+    return {mutant["id"]: get_unified_diff(mutant["id"], [], update_cache=False) for mutant in mutants}
+
+
+def apply_diff(source, diff):
+    """Return `source` with the single-hunk unified `diff` applied, or None if it does not match."""
+    old, new = [], []
+    for line in diff.splitlines():
+        if line.startswith(("---", "+++", "@@", "\\")):
+            continue
+        if line.startswith("-"):
+            old.append(line[1:])
+        elif line.startswith("+"):
+            new.append(line[1:])
+        else:
+            old.append(line[1:])
+            new.append(line[1:])
+    old, new = "\n".join(old), "\n".join(new)
+    if old == new or old not in source:
+        return None
+    return source.replace(old, new, 1)
+
+
+# Outcome names of manual_mutation_testing for mutmut's statuses; others are kept as they are
+OUTCOMES = {SURVIVED: "survived", KILLED: "killed", SUSPICIOUS: "killed", TIMEOUT: "timeout"}
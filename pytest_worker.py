@@ -0,0 +1,278 @@
+"""
+Warm pytest worker that forks a child per mutant.
+
+The server imports pytest and collects the suite once, then waits for
+requests. For each mutant it forks: the child swaps the mutated code into
+the already-imported module, runs the selected tests and writes the result
+back over a pipe. The parent never runs a test, so every child starts from
+the same clean, fully collected state.
+
+Tests bind names with `from calculator import add`, so replacing the module
+in sys.modules would not reach them. Instead the child patches the code
+objects of the existing functions in place, which every reference sees.
+
+Requests and responses are newline-delimited JSON on two dedicated pipes,
+keeping pytest's own terminal output out of the protocol. The first line
+sets the worker up; `source`, if given, is served for the module at import
+(e.g. a schema module from mutation_schemata) as if loaded from `origin`:
+
+    setup:    {"source": "<module source>" | null, "origin": "<module file>" | null}
+    request:  {"source": "<mutated module source>" | null, "mutant_id": int | null,
+               "tests": [node ids] | null,
+               "fail_fast": bool, "first": [node ids],
+               "timeout": seconds | null, "limits": {"memory_mb": .., "cpu_seconds": ..}}
+    response: {"survived": bool, "failed": [node ids],
+               "status": "passed" | "failed" | "timeout" | "resource"}
+
+`mutant_id` selects a mutant of a schema module by setting its
+`__mutant_id__`; `source` swaps in mutated code. `first` moves the listed
+tests to the front of the run, and `fail_fast`
+stops at the first failing test. A child that outlives `timeout` is killed;
+`limits` are applied to the child as RLIMIT_AS / RLIMIT_CPU.
+"""
+import importlib
+import json
+import math
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+import types
+
+from mutant_loader import install
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; limits are then simply not enforced
+    resource = None
+
+
+def _cap(limit, value):
+    """Lower a resource limit to `value`, never above the current hard limit."""
+    soft, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, hard if limit == resource.RLIMIT_CPU else value))
+
+
+def set_resource_limits(memory_mb=None, cpu_seconds=None):
+    """Cap this process's address space (MiB) and CPU time (seconds)."""
+    if resource is None:
+        return
+    if memory_mb:
+        _cap(resource.RLIMIT_AS, int(memory_mb) * 1024 * 1024)
+    if cpu_seconds:
+        # The soft limit raises SIGXCPU; the hard limit stays as a backstop
+        _cap(resource.RLIMIT_CPU, int(math.ceil(cpu_seconds)))
+
+
+def _patch_function(old, new):
+    """Point `old` at the code of `new`; False if they are not compatible."""
+    if old.__code__.co_freevars != new.__code__.co_freevars:
+        return False
+    old.__code__ = new.__code__
+    old.__defaults__ = new.__defaults__
+    old.__kwdefaults__ = new.__kwdefaults__
+    return True
+
+
+def _patch_class(old, new):
+    """Patch the methods of `old` in place with those of `new`."""
+    for name, value in vars(new).items():
+        current = vars(old).get(name)
+        if isinstance(current, types.FunctionType) and isinstance(value, types.FunctionType):
+            if _patch_function(current, value):
+                continue
+        if name not in ("__dict__", "__weakref__"):
+            setattr(old, name, value)
+
+
+def swap_module_code(module, source):
+    """Execute `source` and graft the result onto the live `module`."""
+    namespace = {
+        "__name__": module.__name__,
+        "__file__": getattr(module, "__file__", None),
+        "__builtins__": __builtins__,
+    }
+    exec(compile(source, namespace["__file__"] or module.__name__, "exec"), namespace)
+
+    for name, new in namespace.items():
+        if name.startswith("__") and name.endswith("__"):
+            continue
+        old = module.__dict__.get(name)
+        if isinstance(old, types.FunctionType) and isinstance(new, types.FunctionType):
+            if _patch_function(old, new):
+                continue
+        elif isinstance(old, type) and isinstance(new, type) and old.__module__ == module.__name__:
+            _patch_class(old, new)
+            continue
+        module.__dict__[name] = new
+
+
+class WorkerPlugin:
+    """Pytest plugin that serves mutant requests instead of running the suite."""
+
+    def __init__(self, module_name, requests, responses):
+        self.module_name = module_name
+        self.requests = requests
+        self.responses = responses
+        self.failed = []
+        self.out_of_memory = False
+
+    def pytest_runtest_logreport(self, report):
+        if report.failed and report.nodeid not in self.failed:
+            self.failed.append(report.nodeid)
+            if "MemoryError" in str(report.longrepr):
+                self.out_of_memory = True
+
+    def pytest_runtestloop(self, session):
+        items = {item.nodeid: item for item in session.items}
+        for line in self.requests:
+            request = json.loads(line)
+            selected = session.items
+            if request.get("tests") is not None:
+                selected = [items[test] for test in request["tests"] if test in items]
+            first = [items[test] for test in request.get("first") or [] if test in items]
+            if first:
+                selected = first + [item for item in selected if item not in first]
+            result = self._fork(session, request.get("source"), selected, request.get("fail_fast", False),
+                                request.get("timeout"), request.get("limits") or {}, request.get("mutant_id"))
+            self.responses.write(json.dumps(result) + "\n")
+            self.responses.flush()
+        return True
+
+    def _fork(self, session, source, items, fail_fast=False, timeout=None, limits=None, mutant_id=None):
+        """Run `items` against `source` in a forked child and return the result."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            result = {"survived": False, "failed": [], "status": "failed"}
+            try:
+                set_resource_limits(**(limits or {}))
+                module = sys.modules.get(self.module_name)
+                if module is None:
+                    module = importlib.import_module(self.module_name)
+                if mutant_id is not None:
+                    module.__mutant_id__ = mutant_id
+                if source is not None:
+                    swap_module_code(module, source)
+                self._run_items(session, items, fail_fast)
+                status = "resource" if self.out_of_memory else "failed" if self.failed else "passed"
+                result = {"survived": not self.failed, "failed": self.failed, "status": status}
+            except MemoryError as e:
+                result = {"survived": False, "failed": [], "status": "resource", "error": repr(e)}
+            except BaseException as e:
+                # A mutant that cannot even load counts as killed
+                result = {"survived": False, "failed": [], "status": "failed", "error": repr(e)}
+            finally:
+                with os.fdopen(write_fd, "w") as out:
+                    out.write(json.dumps(result))
+                os._exit(0)
+
+        os.close(write_fd)
+        data, timed_out = self._read_child(read_fd, timeout)
+        if timed_out:
+            os.kill(pid, signal.SIGKILL)
+        _, wait_status = os.waitpid(pid, 0)
+        if timed_out:
+            return {"survived": False, "failed": [], "status": "timeout"}
+        if not data:
+            # The child died before reporting: a resource limit signal or a crash
+            return {"survived": False, "failed": [], "status": "resource" if os.WIFSIGNALED(wait_status) else "failed",
+                    "error": "worker child crashed"}
+        return json.loads(data)
+
+    def _read_child(self, read_fd, timeout):
+        """Read the child's report until EOF; return (data, timed_out)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        chunks = []
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return b"", True
+                ready, _, _ = select.select([read_fd], [], [], remaining)
+                if not ready:
+                    return b"", True
+                chunk = os.read(read_fd, 65536)
+                if not chunk:
+                    return b"".join(chunks), False
+                chunks.append(chunk)
+        finally:
+            os.close(read_fd)
+
+    def _run_items(self, session, items, fail_fast=False):
+        hook = session.config.hook
+        for index, item in enumerate(items):
+            nextitem = items[index + 1] if index + 1 < len(items) else None
+            hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+            if fail_fast and self.failed:
+                break
+
+
+class PytestWorker:
+    """Client handle for a warm worker server running in a subprocess."""
+
+    def __init__(self, module_name, pytest_args=(), cwd=None, module_source=None, module_file=None):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("The warm pytest worker requires os.fork()")
+
+        request_read, self._request_write = os.pipe()
+        self._response_read, response_write = os.pipe()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), module_name,
+             str(request_read), str(response_write), "-q", "-p", "no:cacheprovider", *pytest_args],
+            pass_fds=(request_read, response_write),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=cwd
+        )
+        os.close(request_read)
+        os.close(response_write)
+        self.requests = os.fdopen(self._request_write, "w")
+        self.responses = os.fdopen(self._response_read, "r")
+        self.requests.write(json.dumps({"source": module_source, "origin": module_file}) + "\n")
+        self.requests.flush()
+
+    def run(self, source=None, tests=None, fail_fast=False, first=None, timeout=None, limits=None, mutant_id=None):
+        """Run `tests` (default: all) against `source` or schema mutant `mutant_id`."""
+        request = {"source": source, "mutant_id": mutant_id, "tests": tests, "fail_fast": fail_fast,
+                   "first": first, "timeout": timeout, "limits": limits}
+        self.requests.write(json.dumps(request) + "\n")
+        self.requests.flush()
+        line = self.responses.readline()
+        if not line:
+            raise RuntimeError("Warm pytest worker exited unexpectedly")
+        return json.loads(line)
+
+    def close(self):
+        """Stop the server and wait for it to exit."""
+        if self.process.poll() is None:
+            self.requests.close()
+            self.process.wait()
+        self.responses.close()
+
+
+def main(argv):
+    """Collect the suite and serve requests from the given pipe fds."""
+    module_name, request_fd, response_fd, pytest_args = argv[0], int(argv[1]), int(argv[2]), argv[3:]
+    sys.path.insert(0, os.getcwd())
+    sys.dont_write_bytecode = True
+
+    import pytest
+    with os.fdopen(request_fd, "r") as requests, os.fdopen(response_fd, "w") as responses:
+        setup = json.loads(requests.readline() or "{}")
+        if setup.get("source") is not None:
+            # The file comes from the client: finding it here would import the
+            # parent package, which may bind the original module's names first
+            install(module_name, setup["source"], os.path.abspath(setup["origin"]))
+        plugin = WorkerPlugin(module_name, requests, responses)
+        return pytest.main(pytest_args, plugins=[plugin])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
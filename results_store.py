@@ -0,0 +1,242 @@
+"""
+SQLite store of mutant outcomes across runs.
+
+Every run and every mutant it tested is kept in one database, indexed by
+file, function, operator, run and cache key, so questions about past runs
+are queries instead of re-runs:
+
+    store = ResultsStore()
+    store.survivors(function="gcd", last_runs=30)
+    store.slowest(10)
+
+The store is also where outcomes are cached and kills are counted when it
+is in use: StoreCache and StoreHistory offer the interfaces of
+mutation_cache.MutationCache and KillHistory over the recorded mutants.
+
+Run as a script it prints reports:
+
+    python results_store.py runs
+    python results_store.py survivors --function gcd --last-runs 30
+    python results_store.py slowest --limit 10
+"""
+import argparse
+import ast
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_STORE_FILE = "mutation_results.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    targets TEXT NOT NULL,
+    options TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mutants (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    mutant TEXT NOT NULL,
+    file TEXT NOT NULL,
+    function TEXT,
+    line INTEGER,
+    col INTEGER,
+    operator TEXT,
+    outcome TEXT NOT NULL,
+    duration REAL,
+    killer TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    cache_key TEXT
+);
+CREATE INDEX IF NOT EXISTS mutants_run ON mutants(run);
+CREATE INDEX IF NOT EXISTS mutants_file_line ON mutants(file, line);
+CREATE INDEX IF NOT EXISTS mutants_function ON mutants(function);
+CREATE INDEX IF NOT EXISTS mutants_operator ON mutants(operator);
+CREATE INDEX IF NOT EXISTS mutants_cache_key ON mutants(cache_key);
+CREATE INDEX IF NOT EXISTS mutants_duration ON mutants(duration);
+"""
+
+
+def function_names(source, mutations):
+    """Return {mutant id: name of its innermost enclosing function, or None}."""
+    spans = [
+        (node.lineno, node.end_lineno, node.name)
+        for node in ast.walk(ast.parse(source))
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+    names = {}
+    for mutation in mutations:
+        best = None
+        for first, last, name in spans:
+            if first <= mutation["line"] <= last and (best is None or first >= best[0]):
+                best = (first, name)
+        names[mutation["id"]] = best[1] if best else None
+    return names
+
+
+class ResultsStore:
+    """Runs and mutant outcomes in a SQLite database at `path`."""
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # WAL keeps each committed mutant cheap and readable while a run is going
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    def start_run(self, targets, options=None):
+        """Record the start of a run over `targets`; return its id."""
+        cursor = self.connection.execute(
+            "INSERT INTO runs (started, targets, options) VALUES (?, ?, ?)",
+            (time.time(), json.dumps(list(targets)), json.dumps(options or {}, sort_keys=True))
+        )
+        self.connection.commit()
+        return cursor.lastrowid
+
+    def finish_run(self, run):
+        self.connection.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run))
+        self.connection.commit()
+
+    def record(self, run, mutation, outcome, duration=None, killer=None, cached=False, key=None, function=None):
+        """Store the outcome of one mutant of `run`; committed at once so an interrupted run keeps it."""
+        self.connection.execute(
+            "INSERT INTO mutants (run, mutant, file, function, line, col, operator, outcome, duration, killer,"
+            " cached, cache_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run, mutation["id"], mutation["file"], function, mutation.get("line"), mutation.get("col"),
+             mutation.get("operator"), outcome, duration, killer, int(cached), key)
+        )
+        self.connection.commit()
+
+    def cached_outcome(self, key):
+        """Return the latest outcome recorded under cache `key`, or None."""
+        row = self.connection.execute(
+            "SELECT outcome FROM mutants WHERE cache_key = ? ORDER BY rowid DESC LIMIT 1", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def kill_ranking(self, location):
+        """Return the tests that killed mutants at `location` ("file:line"), most kills first."""
+        file, line = location.rsplit(":", 1)
+        rows = self.connection.execute(
+            "SELECT killer FROM mutants WHERE file = ? AND line = ? AND killer IS NOT NULL AND cached = 0"
+            " GROUP BY killer ORDER BY COUNT(*) DESC, MIN(rowid)", (file, int(line))
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def runs(self, limit=20):
+        """Return the latest runs with their mutant counts, newest first."""
+        rows = self.connection.execute(
+            "SELECT runs.id, runs.started, runs.finished, runs.targets, COUNT(mutants.rowid),"
+            " SUM(mutants.outcome IN ('survived', 'no coverage')), SUM(mutants.cached)"
+            " FROM runs LEFT JOIN mutants ON mutants.run = runs.id"
+            " GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            {"run": run, "started": started, "finished": finished, "targets": json.loads(targets),
+             "mutants": total, "surviving": surviving or 0, "cached": cached or 0}
+            for run, started, finished, targets, total, surviving, cached in rows
+        ]
+
+    def survivors(self, file=None, function=None, operator=None, last_runs=None):
+        """Return the surviving or uncovered mutants matching the filters, newest run first."""
+        conditions = ["outcome IN ('survived', 'no coverage')"]
+        parameters = []
+        for column, value in (("file", file), ("function", function), ("operator", operator)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if last_runs:
+            conditions.append("run IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)")
+            parameters.append(last_runs)
+        return self._mutants(f"WHERE {' AND '.join(conditions)} ORDER BY run DESC, file, line", parameters)
+
+    def slowest(self, limit=10):
+        """Return the mutants that took longest to test."""
+        return self._mutants("WHERE duration IS NOT NULL ORDER BY duration DESC LIMIT ?", [limit])
+
+    def _mutants(self, clause, parameters):
+        columns = ("run", "mutant", "file", "function", "line", "operator", "outcome", "duration", "killer")
+        rows = self.connection.execute(f"SELECT {', '.join(columns)} FROM mutants {clause}", parameters).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class StoreCache:
+    """MutationCache interface over a ResultsStore.
+
+    An outcome is cached by recording its mutant with the cache key, so
+    put() has nothing left to do.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        return self.store.cached_outcome(key)
+
+    def put(self, key, outcome):
+        pass
+
+    def save(self):
+        self.store.commit()
+
+
+class StoreHistory:
+    """KillHistory interface over a ResultsStore; kills are the recorded killing tests."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def record(self, location, test_id):
+        pass
+
+    def ranking(self, location):
+        return self.store.kill_ranking(location)
+
+    def save(self):
+        self.store.commit()
+
+
+def _print_mutants(mutants):
+    for mutant in mutants:
+        duration = f"{mutant['duration']:.3f}s" if mutant["duration"] is not None else "-"
+        print(f"run {mutant['run']}  {mutant['file']}:{mutant['line']}  {mutant['function'] or '(module)'}  "
+              f"{mutant['operator'] or '-'}  {mutant['outcome']}  {duration}  {mutant['killer'] or ''}".rstrip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on stored mutation testing results")
+    parser.add_argument("--db", default=DEFAULT_STORE_FILE, help="results database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs_parser = commands.add_parser("runs", help="latest runs and their surviving mutants")
+    runs_parser.add_argument("--limit", type=int, default=20)
+    survivors_parser = commands.add_parser("survivors", help="surviving mutants, optionally filtered")
+    survivors_parser.add_argument("--file")
+    survivors_parser.add_argument("--function")
+    survivors_parser.add_argument("--operator")
+    survivors_parser.add_argument("--last-runs", type=int, help="only the latest N runs")
+    slowest_parser = commands.add_parser("slowest", help="mutants that took longest to test")
+    slowest_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"no results database at {args.db}")
+    store = ResultsStore(args.db)
+    if args.command == "runs":
+        for run in store.runs(args.limit):
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started"]))
+            print(f"run {run['run']}  {started}  {', '.join(run['targets'])}: {run['mutants']} mutants, "
+                  f"{run['surviving']} surviving, {run['cached']} cached")
+    elif args.command == "survivors":
+        _print_mutants(store.survivors(args.file, args.function, args.operator, args.last_runs))
+    else:
+        _print_mutants(store.slowest(args.limit))
+    store.close()
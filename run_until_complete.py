@@ -1,82 +1,128 @@
 #!/usr/bin/env python3
-import subprocess
-import re
-import time
+"""
+Run the mutation testing agent until it succeeds or stops making progress.
+
+One MutationTestingAgent is kept alive across iterations, and its state is
+written to disk after each of them, so an interrupted loop picks up where
+it stopped. Progress is read from the agent itself rather than from its
+printed output.
+"""
+import argparse
+import json
+import os
 import sys
 
-def extract_coverage(output):
-    """Extract coverage percentage from output."""
-    # Try to extract calculator module coverage
-    calc_match = re.search(r'(\d+(?:\.\d+)?)% calculator module coverage', output)
-    if calc_match:
-        return float(calc_match.group(1))
-        
-    # Fall back to overall progress
-    progress_match = re.search(r'Progress: (\d+(?:\.\d+)?)%', output)
-    if progress_match:
-        return float(progress_match.group(1))
-        
-    return 0.0
-
-def extract_mutations(output):
-    """Extract mutation information from output."""
-    match = re.search(r'(\d+)/(\d+) mutations killed', output)
-    if match:
-        killed = int(match.group(1))
-        total = int(match.group(2))
-        return killed, total
-    return 0, 0
+from mutation_agent import AGENT_STATE_FILE, ActionInput, MutationTestingAgent
+from results_store import DEFAULT_STORE_FILE
+
+
+def load_state(path):
+    """Return the saved loop state at `path`, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt state file only costs the history: start over
+        return None
+
+
+def save_state(path, state):
+    """Write the loop state atomically so an interrupted run never corrupts it."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def _improved(progress, previous):
+    """Whether an iteration got closer to the goal than the one before."""
+    return (progress["calculator_coverage"] > previous["calculator_coverage"]
+            or progress["coverage"] > previous["coverage"]
+            or progress["killed"] > previous["killed"]
+            or progress["survivors"] < previous["survivors"])
+
+
+def run_until_complete(max_iterations=10, state_file=AGENT_STATE_FILE, patience=1, resume=True, verbose=True,
+                       store_file=DEFAULT_STORE_FILE):
+    """Run full agent cycles in this process until success or convergence.
+
+    The loop has converged once `patience` consecutive iterations neither
+    improved coverage or kills nor added a test. Returns {"status": "success",
+    "converged" or "max_iterations", "iterations", "progress", "history"}.
+    Each mutmut run is recorded in the results store `store_file`, unless
+    it is None.
+    """
+    agent = MutationTestingAgent(store_file)
+    history = []
+    state = load_state(state_file) if resume else None
+    if state:
+        agent.set_state(state["agent"])
+        history = state["history"]
+
+    stalled = 0
+    status = "max_iterations"
+    for _ in range(max_iterations):
+        iteration = len(history) + 1
+        if verbose:
+            print(f"\nIteration {iteration}")
+            print("---------------------------")
+
+        response = agent.run_full_cycle(ActionInput(content="Run full cycle"))
+        if verbose:
+            print(response.content)
+
+        progress = agent.progress()
+        if history and not progress["tests_added"] and not _improved(progress, history[-1]):
+            stalled += 1
+        else:
+            stalled = 0
+        history.append(progress)
+        save_state(state_file, {"agent": agent.get_state(), "history": history})
+
+        if progress["complete"]:
+            status = "success"
+            break
+        if stalled >= patience:
+            status = "converged"
+            break
+
+    return {"status": status, "iterations": len(history), "progress": history[-1] if history else None,
+            "history": history}
+
 
 def main():
     """Run the mutation agent until 100% coverage is achieved."""
-    max_iterations = 10
-    iteration = 1
-    coverage = 0.0
-    killed_mutations = 0
-    total_mutations = 0
-    
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-iterations", type=int, default=10, help="Iterations to run in this invocation")
+    parser.add_argument("--patience", type=int, default=1,
+                        help="Stop after this many consecutive iterations without progress")
+    parser.add_argument("--state", default=AGENT_STATE_FILE, help="File the agent's state is kept in")
+    parser.add_argument("--fresh", action="store_true", help="Ignore any saved state")
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE, help="SQLite results store mutmut runs are recorded in")
+    parser.add_argument("--no-store", action="store_true", help="Do not record mutmut runs in a results store")
+    args = parser.parse_args()
+
     print("Starting mutation testing agent loop")
     print("======================================")
-    
-    while iteration <= max_iterations:
-        print(f"\nIteration {iteration}/{max_iterations}")
-        print("---------------------------")
-        
-        # Run the agent
-        result = subprocess.run(
-            [sys.executable, "mutation_agent.py"],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        
-        # Print output
-        print(result.stdout)
-        if result.stderr:
-            print("Errors:", result.stderr)
-        
-        # Extract progress information
-        prev_coverage = coverage
-        coverage = extract_coverage(result.stdout)
-        prev_killed = killed_mutations
-        killed_mutations, total_mutations = extract_mutations(result.stdout)
-        
-        # Check for success
-        if "SUCCESS!" in result.stdout or coverage >= 100.0:
-            print("\nSuccess! Achieved 100% coverage for calculator module.")
-            return 0
-        
-        # Check for progress
-        if coverage <= prev_coverage and killed_mutations <= prev_killed and iteration > 1:
-            print("\nNo progress made in this iteration.")
-        
-        iteration += 1
-        time.sleep(1)  # Small delay between iterations
-    
-    print("\nMaximum iterations reached without achieving 100% coverage.")
-    print(f"Final coverage: {coverage}%")
-    print(f"Final mutation score: {killed_mutations}/{total_mutations}")
+
+    result = run_until_complete(args.max_iterations, args.state, args.patience, resume=not args.fresh,
+                                store_file=None if args.no_store else args.store)
+    progress = result["progress"]
+
+    if result["status"] == "success":
+        print("\nSuccess! Achieved 100% coverage for calculator module.")
+        return 0
+    if result["status"] == "converged":
+        print(f"\nNo progress in the last {args.patience} iteration(s); stopping.")
+    else:
+        print("\nMaximum iterations reached without achieving 100% coverage.")
+    if progress:
+        print(f"Final coverage: {progress['calculator_coverage']}%")
+        print(f"Final mutation score: {progress['killed']}/{progress['total']}")
     return 1
 
+
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Index of the tests in a test file, for deduplicating generated tests.
+
+The file is parsed once; every test function is indexed by name and by its
+normalized assertion set, the AST dumps of its `assert` statements and
+`with` blocks (e.g. `pytest.raises`). Dumps leave out positions, names of
+the test, comments and docstrings, so two tests asserting the same things
+count as duplicates however they are laid out.
+
+Candidates are checked against the index in O(1), renamed when their name
+is taken, and written together by flush() in one atomic replacement of the
+file.
+"""
+import ast
+import os
+
+
+def assertion_key(function):
+    """Return the normalized assertion set of a test function node."""
+    return frozenset(
+        ast.dump(node) for node in ast.walk(function) if isinstance(node, (ast.Assert, ast.With))
+    )
+
+
+def _test_functions(tree):
+    return [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name.startswith("test")]
+
+
+class SuiteIndex:
+    """Names and assertion sets of the tests in one file, plus tests waiting to be written."""
+
+    def __init__(self, path, preamble=""):
+        self.path = path
+        # Written first when the file does not exist yet
+        self.preamble = preamble
+        self.names = set()
+        self.assertions = set()
+        self.pending = []
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                tree = ast.parse(f.read(), path)
+            for function in _test_functions(tree):
+                self.names.add(function.name)
+                self.assertions.add(assertion_key(function))
+
+    def unique_name(self, name):
+        """Return `name`, or `name` with the first free numeric suffix."""
+        candidate, suffix = name, 2
+        while candidate in self.names:
+            candidate, suffix = f"{name}_{suffix}", suffix + 1
+        return candidate
+
+    def add(self, code):
+        """Queue the test in `code` unless it duplicates one; return its final name or None.
+
+        A test whose assertions match an indexed test is dropped; one whose
+        name is taken is renamed.
+        """
+        functions = _test_functions(ast.parse(code))
+        if not functions:
+            return None
+        key = assertion_key(functions[0])
+        if key in self.assertions:
+            return None
+        name = functions[0].name
+        unique = self.unique_name(name)
+        if unique != name:
+            code = code.replace(f"def {name}(", f"def {unique}(", 1)
+        self.names.add(unique)
+        self.assertions.add(key)
+        self.pending.append(code)
+        return unique
+
+    def flush(self, heading=None):
+        """Append the queued tests in one atomic write; return how many were written."""
+        if not self.pending:
+            return 0
+        content = self.preamble
+        if os.path.exists(self.path):
+            # newline="" keeps the file's own line endings
+            with open(self.path, "r", newline="") as f:
+                content = f.read()
+        newline = "\r\n" if "\r\n" in content else "\n"
+        block = "\n\n".join(test.replace("\r\n", "\n").strip("\n") for test in self.pending)
+        if heading:
+            block = f"{heading}\n{block}"
+        if content and not content.endswith("\n"):
+            content += newline
+        content += (newline if content else "") + block.replace("\n", newline) + newline
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+        written = len(self.pending)
+        self.pending = []
+        return written